@@ -215,6 +215,16 @@ def create_interactive_citations(response_text: str, sources_used: List[Dict[str
                 num = match.group(1)
                 citation_map[num] = source
     
+    # Resolve every cited chunk with one lookup instead of a query per citation
+    chunk_lookup = {}
+    try:
+        if st.session_state.pipeline and st.session_state.pipeline['vector_db']:
+            chunk_ids = [s['chunk_id'] for s in citation_map.values() if s.get('chunk_id')]
+            if chunk_ids:
+                chunk_lookup = st.session_state.pipeline['vector_db'].get_chunks_by_ids(chunk_ids)
+    except Exception:
+        chunk_lookup = None
+    
     def replace_citation(match):
         num = match.group(1)
         if num in citation_map:
@@ -225,15 +235,12 @@ def create_interactive_citations(response_text: str, sources_used: List[Dict[str
             if source.get('page_number'):
                 source_info += f", Page: {source['page_number']}"
             
-            try:
-                if st.session_state.pipeline and st.session_state.pipeline['vector_db']:
-                    chunk_id = source.get('chunk_id')
-                    if chunk_id:
-                        chunk_data = st.session_state.pipeline['vector_db'].get_chunk_by_id(chunk_id)
-                        if chunk_data and chunk_data.get('content'):
-                            chunk_content = chunk_data['content'][:300] + "..."
-            except Exception:
+            if chunk_lookup is None:
                 chunk_content = "Preview unavailable"
+            else:
+                chunk_data = chunk_lookup.get(source.get('chunk_id'))
+                if chunk_data and chunk_data.get('content'):
+                    chunk_content = chunk_data['content'][:300] + "..."
             
             # Escaping for HTML
             c_esc = chunk_content.replace('"', '&quot;').replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')
@@ -35,6 +35,8 @@ class AudioTranscriber:
     def __init__(self, api_key: str):
         self.api_key = api_key
         aai.settings.api_key = api_key
+        # One transcriber for every call, so uploads and polling reuse the SDK's keep-alive connection pool
+        self._transcriber = aai.Transcriber()
         
         self.supported_formats = {
             '.mp3', '.wav', '.m4a', '.aac', '.ogg', 
@@ -69,8 +71,7 @@ class AudioTranscriber:
                 language_code=audio_language,
             )
             
-            transcriber = aai.Transcriber(config=config)
-            transcript = transcriber.transcribe(str(audio_path))
+            transcript = self._transcriber.transcribe(str(audio_path), config=config)
             
             if transcript.status == aai.TranscriptStatus.error:
                 raise Exception(f"Transcription failed: {transcript.error}")
@@ -268,8 +269,7 @@ class AudioTranscriber:
                 summarization=True
             )
             
-            transcriber = aai.Transcriber(config=config)
-            transcript = transcriber.transcribe(str(audio_path))
+            transcript = self._transcriber.transcribe(str(audio_path), config=config)
             
             if transcript.status == aai.TranscriptStatus.error:
                 return {"error": transcript.error}
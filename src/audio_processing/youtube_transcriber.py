@@ -1,7 +1,12 @@
 import logging
 import os
+import json
+import re
+import shutil
 import tempfile
+from dataclasses import asdict
 from pathlib import Path
+from types import MappingProxyType
 from typing import List, Optional
 import yt_dlp
 import assemblyai as aai
@@ -11,25 +16,29 @@ from src.document_processing.doc_processor import DocumentChunk
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_VIDEO_ID_RE = re.compile(r'(?:v=|youtu\.be/|/embed/|/shorts/)([A-Za-z0-9_-]{11})')
+
 
 class YouTubeTranscriber:
-    def __init__(self, assemblyai_api_key: str):
+    def __init__(
+        self,
+        assemblyai_api_key: str,
+        max_cache_bytes: int = 5 << 30,
+        disk_pressure_threshold: float = 0.9
+    ):
         self.assemblyai_api_key = assemblyai_api_key
         self.temp_dir = Path(tempfile.gettempdir()) / "youtube_transcriber"
         self.temp_dir.mkdir(exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.disk_pressure_threshold = disk_pressure_threshold
         
         aai.settings.api_key = assemblyai_api_key
         
         logger.info("YouTubeTranscriber initialized")
     
     def extract_video_id(self, url: str) -> Optional[str]:
-        if "v=" in url:
-            video_id = url.split("v=")[1].split("&")[0]
-        elif "youtu.be/" in url:
-            video_id = url.split("youtu.be/")[1].split("?")[0]
-        else:
-            video_id = None
-        return video_id
+        match = _VIDEO_ID_RE.search(url)
+        return match.group(1) if match else None
     
     def download_audio(self, url: str) -> str:
         video_id = self.extract_video_id(url)
@@ -38,6 +47,8 @@ class YouTubeTranscriber:
         
         expected_path = self.temp_dir / f"{video_id}.m4a"
         if expected_path.exists():
+            # Refresh atime explicitly, relatime/noatime mounts won't do it for us
+            os.utime(expected_path)
             logger.info(f"Audio already exists: {expected_path}")
             return str(expected_path)
         
@@ -64,14 +75,50 @@ class YouTubeTranscriber:
             raise FileNotFoundError(f"Expected audio file not found: {expected_path}")
         
         logger.info(f"Audio downloaded successfully: {expected_path}")
+        self._enforce_cache_budget(keep=expected_path)
         return str(expected_path)
     
+    def _enforce_cache_budget(self, keep: Optional[Path] = None):
+        try:
+            usage = shutil.disk_usage(self.temp_dir)
+            if usage.used / usage.total > self.disk_pressure_threshold:
+                logger.warning("Temp disk under pressure, clearing cached audio")
+                max_bytes = 0
+            else:
+                max_bytes = self.max_cache_bytes
+            
+            files = sorted(
+                ((f, f.stat()) for f in self.temp_dir.glob("*.m4a")),
+                key=lambda item: item[1].st_atime
+            )
+            total_bytes = sum(st.st_size for _, st in files)
+            
+            for file, st in files:
+                if total_bytes <= max_bytes:
+                    break
+                if file == keep:
+                    continue
+                file.unlink()
+                total_bytes -= st.st_size
+                logger.info(f"Evicted cached audio: {file.name}")
+                
+        except Exception as e:
+            logger.warning(f"Could not enforce audio cache budget: {e}")
+    
     def transcribe_youtube_video(
         self,
         url: str,
         cleanup_audio: bool = True
     ) -> List[DocumentChunk]:
         try:
+            video_id = self.extract_video_id(url)
+            cache_path = self._get_transcript_cache_path(video_id) if video_id else None
+            if cache_path and cache_path.exists():
+                chunks = self._load_cached_transcript(cache_path)
+                if chunks is not None:
+                    logger.info(f"Loaded cached transcript: {len(chunks)} utterances")
+                    return chunks
+            
             audio_path = self.download_audio(url)
             
             # Configure transcription with speaker diarization
@@ -87,12 +134,12 @@ class YouTubeTranscriber:
             if transcript.status == aai.TranscriptStatus.error:
                 raise Exception(f"Transcription failed: {transcript.error}")
             
-            chunks = []
-            video_id = self.extract_video_id(url)
-            for i, utterance in enumerate(transcript.utterances):
-                chunk = DocumentChunk(
+            source_file = f"YouTube Video {video_id}"
+            video_metadata = MappingProxyType({'video_url': url, 'video_id': video_id})
+            chunks = [
+                DocumentChunk(
                     content=f"Speaker {utterance.speaker}: {utterance.text}",
-                    source_file=f"YouTube Video {video_id}",
+                    source_file=source_file,
                     source_type="youtube",
                     page_number=None,
                     chunk_index=i,
@@ -103,13 +150,14 @@ class YouTubeTranscriber:
                         'start_time': utterance.start,
                         'end_time': utterance.end,
                         'confidence': getattr(utterance, 'confidence', None),
-                        'video_url': url,
-                        'video_id': video_id
+                        **video_metadata
                     }
                 )
-                chunks.append(chunk)
+                for i, utterance in enumerate(transcript.utterances)
+            ]
             
             logger.info(f"Transcription completed: {len(chunks)} utterances")
+            self._save_cached_transcript(cache_path, chunks)
             
             if cleanup_audio and os.path.exists(audio_path):
                 os.unlink(audio_path)
@@ -121,6 +169,28 @@ class YouTubeTranscriber:
             logger.error(f"Error transcribing YouTube video: {str(e)}")
             raise
     
+    def _get_transcript_cache_path(self, video_id: str) -> Path:
+        return self.temp_dir / f"{video_id}.transcript.json"
+    
+    def _load_cached_transcript(self, cache_path: Path) -> Optional[List[DocumentChunk]]:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return [DocumentChunk(**chunk_data) for chunk_data in json.load(f)]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable transcript cache {cache_path}: {e}")
+            return None
+    
+    def _save_cached_transcript(self, cache_path: Optional[Path], chunks: List[DocumentChunk]):
+        if cache_path is None:
+            return
+        try:
+            tmp_path = cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([asdict(chunk) for chunk in chunks], f)
+            tmp_path.replace(cache_path)
+        except Exception as e:
+            logger.warning(f"Could not cache transcript: {e}")
+    
     def cleanup_temp_files(self):
         try:
             if self.temp_dir.exists():
@@ -12,7 +12,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunk:
     """Represents a processed document chunk with metadata for citations"""
     content: str
@@ -66,7 +66,7 @@ class DocumentProcessor:
         if file_path.suffix.lower() not in self.supported_formats:
             raise ValueError(f"Unsupported file format: {file_path.suffix}")
         
-        logger.info(f"Processing document: {file_path.name}")
+        logger.debug("Processing document: %s", file_path.name)
         
         try:
             if file_path.suffix.lower() == '.pdf':
@@ -109,7 +109,7 @@ class DocumentProcessor:
                 chunks.extend(page_chunks)
             
             doc.close()
-            logger.info(f"Processed PDF: {len(chunks)} chunks from {total_pages} pages")
+            logger.debug("Processed PDF: %d chunks from %d pages", len(chunks), total_pages)
             
         except Exception as e:
             logger.error(f"Error processing PDF {file_path}: {str(e)}")
@@ -136,7 +136,7 @@ class DocumentProcessor:
                 additional_metadata=metadata
             )
             
-            logger.info(f"Processed text file: {len(chunks)} chunks")
+            logger.debug("Processed text file: %d chunks", len(chunks))
             return chunks
             
         except Exception as e:
@@ -167,6 +167,8 @@ class DocumentProcessor:
                 if boundary > start + self.chunk_size * 0.5:
                     end = boundary + 1
             
+            # strip() hands back the slice itself when there is nothing to trim, so most
+            # chunks are copied out of text only once
             chunk_text = text[start:end].strip()
             
             if chunk_text:
@@ -0,0 +1,64 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """SQLite store of chunk embeddings keyed by a hash of (model, text), so re-ingestion skips the model"""
+    
+    def __init__(self, path: str = ".embedding_cache.sqlite", embedding_model: str = ""):
+        self.path = Path(path)
+        self.embedding_model = embedding_model
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # One connection shared across ingestion threads, serialized by the lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_emb (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+            )
+        logger.info(f"Embedding cache opened at {self.path}")
+    
+    def key(self, text: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.embedding_model.encode())
+        digest.update(b"\0")
+        digest.update(text.encode())
+        return digest.digest()
+    
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM chunk_emb WHERE hash IN ({placeholders})", batch
+                ).fetchall()
+                for key, vec in rows:
+                    found[key] = np.frombuffer(vec, dtype=np.float16)
+        return found
+    
+    def put_many(self, items: List[Tuple[bytes, np.ndarray]]):
+        if not items:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_emb (hash, vec) VALUES (?, ?)",
+                [(key, np.asarray(vec, dtype=np.float16).tobytes()) for key, vec in items]
+            )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
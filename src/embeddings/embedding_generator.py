@@ -1,49 +1,114 @@
 import logging
-from typing import List, Dict, Any, Tuple
+import os
+from typing import List, Dict, Any, Tuple, Optional
 import numpy as np
 from dataclasses import dataclass
 
 from fastembed import TextEmbedding
 from src.document_processing.doc_processor import DocumentChunk
+from src.embeddings.embedding_cache import EmbeddingCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# fastembed already runs the model through ONNX Runtime; backends only pick execution providers.
+# CUDA needs the fastembed-gpu build and falls back to CPU for unsupported ops
+_EMBEDDING_BACKENDS = {
+    "onnx-cpu": (["CPUExecutionProvider"], 256),
+    "onnx-cuda": (["CUDAExecutionProvider", "CPUExecutionProvider"], 64),
+}
 
-@dataclass
+
+@dataclass(slots=True)
 class EmbeddedChunk:
     """Document chunk with its embedding vector"""
     chunk: DocumentChunk
     embedding: np.ndarray
     embedding_model: str
     
-    def to_vector_db_format(self) -> Dict[str, Any]:
-        return {
+    def to_vector_db_format(self, include_vector: bool = True) -> Dict[str, Any]:
+        # Milvus INT32 columns can't hold None, -1 marks a missing value
+        row = {
             'id': self.chunk.chunk_id,
-            'vector': self.embedding.tolist(),
             'content': self.chunk.content,
             'source_file': self.chunk.source_file,
             'source_type': self.chunk.source_type,
-            'page_number': self.chunk.page_number,
+            'page_number': self.chunk.page_number or -1,
             'chunk_index': self.chunk.chunk_index,
-            'start_char': self.chunk.start_char,
-            'end_char': self.chunk.end_char,
+            'start_char': self.chunk.start_char or -1,
+            'end_char': self.chunk.end_char or -1,
+            'url': self.chunk.metadata.get('original_url') or self.chunk.metadata.get('video_url') or '',
             'metadata': self.chunk.metadata,
             'embedding_model': self.embedding_model
         }
+        if include_vector:
+            row['vector'] = self.embedding.astype(np.float32).tolist()
+        return row
+
+
+class EmbeddingStore:
+    """Contiguous float16 embedding matrix with row-aligned document chunks"""
+    
+    def __init__(self, dim: int, embedding_model: str):
+        self.vecs = np.empty((0, dim), dtype=np.float16)
+        self.chunks: List[DocumentChunk] = []
+        self.embedding_model = embedding_model
+    
+    def __len__(self) -> int:
+        return len(self.chunks)
+    
+    def extend(self, chunks: List[DocumentChunk], embeddings) -> None:
+        new_vecs = np.empty((len(chunks), self.vecs.shape[1]), dtype=np.float16)
+        written = 0
+        for embedding in embeddings:
+            if written == len(chunks):
+                raise ValueError(f"Embedding backend returned more than {len(chunks)} embeddings")
+            new_vecs[written] = embedding
+            written += 1
+        # Unfilled rows of np.empty are garbage and must never reach the vector DB
+        if written != len(chunks):
+            raise ValueError(f"Embedding backend returned {written} embeddings for {len(chunks)} chunks")
+        
+        self.vecs = new_vecs if not len(self.vecs) else np.concatenate([self.vecs, new_vecs])
+        self.chunks.extend(chunks)
+    
+    def to_embedded_chunks(self) -> List[EmbeddedChunk]:
+        # Each embedding is a row view into the shared matrix, not a copy
+        return [
+            EmbeddedChunk(chunk=chunk, embedding=self.vecs[i], embedding_model=self.embedding_model)
+            for i, chunk in enumerate(self.chunks)
+        ]
 
 
 class EmbeddingGenerator:
-    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5"):
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-small-en-v1.5",
+        threads: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        backend: str = "onnx-cpu"
+    ):
+        if backend not in _EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}', expected one of {list(_EMBEDDING_BACKENDS)}")
         self.model_name = model_name
+        self.backend = backend
+        self.providers, self.batch_size = _EMBEDDING_BACKENDS[backend]
+        # Persisted embeddings let an interrupted or repeated ingestion skip already-embedded chunks
+        self.cache = EmbeddingCache(cache_path, self.model_name) if cache_path else None
+        # Half the cores by default so ONNX Runtime doesn't oversubscribe when called from worker pools
+        self.threads = threads or max(1, (os.cpu_count() or 2) // 2)
         self.model = None
         self.embedding_dim = None
         self._initialize_model()
     
     def _initialize_model(self):
         try:
-            logger.info(f"Initializing embedding model: {self.model_name}")
-            self.model = TextEmbedding(model_name=self.model_name)
+            logger.info(f"Initializing embedding model: {self.model_name} ({self.backend}, {self.threads} threads)")
+            self.model = TextEmbedding(
+                model_name=self.model_name,
+                threads=self.threads,
+                providers=self.providers
+            )
             
             sample_embedding = list(self.model.embed(["test"]))[0]
             self.embedding_dim = len(sample_embedding)
@@ -58,28 +123,44 @@ class EmbeddingGenerator:
         if not chunks:
             return []
         
-        logger.info(f"Generating embeddings for {len(chunks)} chunks")
+        # Called once per ingestion batch, so per-batch lines stay at DEBUG with lazy formatting
+        logger.debug("Generating embeddings for %d chunks", len(chunks))
         
         try:
             texts = [chunk.content for chunk in chunks]
             
-            embeddings = list(self.model.embed(texts))
-            embedded_chunks = []
-            for chunk, embedding in zip(chunks, embeddings):
-                embedded_chunk = EmbeddedChunk(
-                    chunk=chunk,
-                    embedding=np.array(embedding, dtype=np.float32),
-                    embedding_model=self.model_name
-                )
-                embedded_chunks.append(embedded_chunk)
+            store = EmbeddingStore(self.embedding_dim, self.model_name)
+            if self.cache:
+                store.extend(chunks, self._embed_with_cache(texts))
+            else:
+                store.extend(chunks, self.model.embed(texts, batch_size=self.batch_size))
+            embedded_chunks = store.to_embedded_chunks()
             
-            logger.info(f"Successfully generated {len(embedded_chunks)} embeddings")
+            logger.debug("Successfully generated %d embeddings", len(embedded_chunks))
             return embedded_chunks
             
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
     
+    def _embed_with_cache(self, texts: List[str]) -> List[np.ndarray]:
+        keys = [self.cache.key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        
+        embeddings = [cached.get(key) for key in keys]
+        if missing:
+            new_items = []
+            missing_texts = [texts[i] for i in missing]
+            for i, embedding in zip(missing, self.model.embed(missing_texts, batch_size=self.batch_size)):
+                embeddings[i] = embedding
+                new_items.append((keys[i], embedding))
+            # Written as soon as a batch is embedded, so a crash later in ingestion loses nothing
+            self.cache.put_many(new_items)
+        
+        logger.debug("Reused %d cached embeddings, computed %d", len(texts) - len(missing), len(missing))
+        return embeddings
+    
     def generate_query_embedding(self, query_text: str) -> np.ndarray:
         try:
             embedding = list(self.model.embed([query_text]))[0]
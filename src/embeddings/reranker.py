@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    """Cross-encoder rescoring of retrieved chunks, with a TTL cache of (query, chunk) scores"""
+    
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-base",
+        threads: Optional[int] = None,
+        cache_size: int = 10_000,
+        cache_ttl: float = 15 * 60
+    ):
+        self.model_name = model_name
+        self.threads = threads or max(1, (os.cpu_count() or 2) // 2)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._score_cache: "OrderedDict[Tuple[bytes, str], Tuple[float, float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        try:
+            logger.info(f"Initializing reranker model: {self.model_name} ({self.threads} threads)")
+            self.model = TextCrossEncoder(
+                model_name=self.model_name,
+                threads=self.threads,
+                providers=["CPUExecutionProvider"]
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize reranker model: {str(e)}")
+            raise
+    
+    def score_batch(self, query: str, results: List[Dict[str, Any]]) -> List[float]:
+        query_key = hashlib.sha256(query.encode()).digest()[:16]
+        now = time.monotonic()
+        scores: List[Optional[float]] = [None] * len(results)
+        
+        with self._cache_lock:
+            for i, result in enumerate(results):
+                cached = self._score_cache.get((query_key, result['id']))
+                if cached is not None and now - cached[1] <= self.cache_ttl:
+                    self._score_cache.move_to_end((query_key, result['id']))
+                    scores[i] = cached[0]
+        
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            new_scores = self.model.rerank(query, [results[i]['content'] for i in missing])
+            with self._cache_lock:
+                for i, score in zip(missing, new_scores):
+                    scores[i] = float(score)
+                    self._score_cache[(query_key, results[i]['id'])] = (scores[i], now)
+                while len(self._score_cache) > self.cache_size:
+                    self._score_cache.popitem(last=False)
+        
+        return scores
+    
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        if not results:
+            return results
+        
+        try:
+            scores = self.score_batch(query, results)
+        except Exception as e:
+            # Vector order is still a usable ranking, never fail the answer over reranking
+            logger.error(f"Error reranking results: {str(e)}")
+            return results[:top_k]
+        
+        order = sorted(range(len(results)), key=scores.__getitem__, reverse=True)[:top_k]
+        reranked = []
+        for i in order:
+            result = dict(results[i])
+            result['rerank_score'] = scores[i]
+            reranked.append(result)
+        return reranked
@@ -0,0 +1,36 @@
+import re
+
+_QUOTED_RE = re.compile(r'"[^"]+"|“[^”]+”')
+_FILENAME_RE = re.compile(r'\S+\.(?:pdf|txt|md)', re.IGNORECASE)
+
+# Greetings, acknowledgements and sign-offs; messages made only of these words never need retrieval
+_FILLER_WORDS = frozenset({
+    "hi", "hello", "hey", "there", "ok", "okay", "thanks", "thank", "you", "thx", "a", "lot",
+    "so", "much", "cool", "great", "nice", "got", "it", "sure", "yes", "no", "bye", "goodbye",
+    "good", "morning", "afternoon", "evening", "night", "awesome", "perfect", "cheers"
+})
+_META_RE = re.compile(
+    # Anchored at both ends: "what can you do about overfitting?" is a document question
+    r'^(?:who are you|what are you|what can you do|how are you|how do you work|are you there)[\s?.!]*$',
+    re.IGNORECASE
+)
+
+
+def is_literal(question: str) -> bool:
+    """True for exact lookups (quoted phrases, bare filenames, single-token tags)"""
+    # Vector order is already right for these, so a cross-encoder pass is wasted latency
+    question = question.strip()
+    return (
+        bool(_QUOTED_RE.search(question))
+        or bool(_FILENAME_RE.fullmatch(question))
+        or len(question.split()) == 1
+    )
+
+
+def needs_retrieval(question: str) -> bool:
+    """False for chitchat and questions about the assistant itself"""
+    normalized = question.strip().lower()
+    if _META_RE.match(normalized):
+        return False
+    words = re.findall(r"[\w']+", normalized)
+    return not words or len(words) > 5 or not all(word in _FILLER_WORDS for word in words)
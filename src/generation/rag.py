@@ -1,16 +1,71 @@
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from dataclasses import dataclass, replace
+import numpy as np
 
 from crewai import LLM
+from litellm import completion
 from src.vector_database.milvus_vector_db import MilvusVectorDB
 from src.embeddings.embedding_generator import EmbeddingGenerator
+from src.embeddings.reranker import Reranker
+from src.generation.rate_limiter import RateLimiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_RAG_PROMPT = """You are an AI assistant that answers questions based on provided source material. You must follow these citation rules:
 
-@dataclass
+CITATION REQUIREMENTS:
+1. For each factual claim in your answer, include the citation reference number in square brackets [1], [2], etc.
+2. Only use information from the provided context - do not add external knowledge
+3. If you cannot find relevant information in the context, say so clearly
+4. Be precise and accurate in your citations
+5. When multiple sources support the same point, list all relevant citations like this [1], [2], [3].
+
+CONTEXT (with citation references):
+{context}
+
+QUESTION: {query}
+
+Please provide a comprehensive answer with proper citations. Make sure every factual statement is supported by a citation reference."""
+
+_SUMMARY_PROMPT_TMPL = """You are tasked with creating a summary of the provided document content. Follow these guidelines:
+
+1. {length_instruction}
+2. Include citations [1], [2], etc. for all factual claims
+3. Organize information logically with clear topics
+4. Focus on the most important and relevant information
+5. Maintain accuracy and cite sources properly
+
+DOCUMENT CONTENT (with citation references):
+{context}
+
+Please provide a well-structured summary with proper citations:"""
+
+_SUMMARY_QUERY = "main topics key findings important information overview"
+
+_CHAT_PROMPT = """You are an AI assistant for a notebook of user-provided documents. The user's message below is conversational rather than a question about the documents. Reply briefly and naturally, and offer to help with questions about their sources.
+
+MESSAGE: {query}"""
+
+_SUMMARY_LENGTH_INSTRUCTIONS = {
+    'short': "Provide a concise 2-3 paragraph summary highlighting the most important points.",
+    'medium': "Provide a comprehensive 4-5 paragraph summary covering key topics and findings.",
+    'long': "Provide a detailed summary with multiple sections covering all major topics and supporting details."
+}
+
+
+def _document_order(result: Dict[str, Any]) -> Tuple[str, int, int]:
+    citation = result['citation']
+    page_number = citation.get('page_number')
+    return (
+        citation.get('source_file') or '',
+        page_number if page_number is not None else -1,
+        citation.get('chunk_index', -1)
+    )
+
+
+@dataclass(slots=True)
 class RAGResult:
     """Represents the result of RAG generation with citations"""
     query: str
@@ -18,6 +73,7 @@ class RAGResult:
     sources_used: List[Dict[str, Any]]
     retrieval_count: int
     generation_tokens: Optional[int] = None
+    model_name: str = "unknown"
     
     def get_citation_summary(self) -> str:
         if not self.sources_used:
@@ -41,10 +97,16 @@ class RAGGenerator:
         openai_api_key: str,
         model_name: str = "gpt-4o-mini",
         temperature: float = 0.1,
-        max_tokens: int = 2000
+        max_tokens: int = 2000,
+        reranker: Optional[Reranker] = None,
+        rerank_oversample: int = 3,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         self.embedding_generator = embedding_generator
         self.vector_db = vector_db
+        self.reranker = reranker
+        self.rerank_oversample = rerank_oversample
+        self.rate_limiter = rate_limiter
         
         self.llm = LLM(
             model=f"openai/{model_name}",
@@ -54,6 +116,8 @@ class RAGGenerator:
         )
         
         self.model_name = model_name
+        # The summary retrieval query never changes, so it is embedded at most once
+        self._summary_query_vector: Optional[np.ndarray] = None
         logger.info(f"RAG Generator initialized with {model_name}")
     
     def generate_response(
@@ -62,51 +126,29 @@ class RAGGenerator:
         max_chunks: int = 8,
         max_context_chars: int = 4000,
         top_k: int = 10,
+        query_vector: Optional[np.ndarray] = None,
+        rerank: bool = True,
     ) -> RAGResult:
 
-        if not query.strip():
-            return RAGResult(
-                query=query,
-                response="Please provide a valid question.",
-                sources_used=[],
-                retrieval_count=0
-            )
-        
         try:
             logger.info(f"Generating response for: '{query[:50]}...'")
             
-            # Step 1: Retrieve relevant chunks
-            query_vector = self.embedding_generator.generate_query_embedding(query)
-            search_results = self.vector_db.search(
-                query_vector=query_vector.tolist(),
-                limit=top_k
-            )
-            
-            if not search_results:
-                return RAGResult(
-                    query=query,
-                    response="I couldn't find any relevant information in the available documents to answer your question.",
-                    sources_used=[],
-                    retrieval_count=0
-                )
-            
-            # Step 2: Format context with citations
-            context, sources_info = self._format_context_with_citations(
-                search_results, max_chunks, max_context_chars
+            early_result, prompt, sources_info, retrieval_count = self._prepare_prompt(
+                query, max_chunks, max_context_chars, top_k, query_vector, rerank
             )
-            
-            # Step 3: Create citation-aware prompt
-            prompt = self._create_rag_prompt(query, context)
+            if early_result is not None:
+                return early_result
             
             # Step 4: Generate response
-            response = self.llm.call(prompt)
+            response = self._call_llm(prompt)
             
             # Step 5: Create result object
             rag_result = RAGResult(
                 query=query,
                 response=response,
                 sources_used=sources_info,
-                retrieval_count=len(search_results)
+                retrieval_count=retrieval_count,
+                model_name=self.model_name
             )
             
             logger.info(f"Response generated successfully using {len(sources_info)} sources")
@@ -121,6 +163,131 @@ class RAGGenerator:
                 retrieval_count=0
             )
     
+    def chat_only(self, query: str) -> RAGResult:
+        """Answer a conversational turn with a short LLM call, skipping embedding and search"""
+        try:
+            response = self._call_llm(_CHAT_PROMPT.format(query=query))
+            return RAGResult(
+                query=query,
+                response=response,
+                sources_used=[],
+                retrieval_count=0,
+                model_name=self.model_name
+            )
+        except Exception as e:
+            logger.error(f"Error generating chat response: {str(e)}")
+            return RAGResult(
+                query=query,
+                response=f"I encountered an error while processing your message: {str(e)}",
+                sources_used=[],
+                retrieval_count=0
+            )
+    
+    def generate_response_stream(
+        self,
+        query: str,
+        max_chunks: int = 8,
+        max_context_chars: int = 4000,
+        top_k: int = 10,
+        query_vector: Optional[np.ndarray] = None,
+        rerank: bool = True,
+    ) -> Tuple[RAGResult, Iterator[str]]:
+        """Retrieve eagerly, then return the result skeleton (empty response) and a token iterator"""
+        
+        try:
+            logger.info(f"Streaming response for: '{query[:50]}...'")
+            
+            early_result, prompt, sources_info, retrieval_count = self._prepare_prompt(
+                query, max_chunks, max_context_chars, top_k, query_vector, rerank
+            )
+            if early_result is not None:
+                return replace(early_result, response=""), iter([early_result.response])
+            
+            rag_result = RAGResult(
+                query=query,
+                response="",
+                sources_used=sources_info,
+                retrieval_count=retrieval_count,
+                model_name=self.model_name
+            )
+            return rag_result, self._stream_tokens(prompt)
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            message = f"I encountered an error while processing your question: {str(e)}"
+            return RAGResult(query=query, response="", sources_used=[], retrieval_count=0), iter([message])
+    
+    def _call_llm(self, prompt: str) -> str:
+        # Queue on the limiter instead of letting requests bounce off provider 429s
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return self.llm.call(prompt)
+    
+    def _stream_tokens(self, prompt: str) -> Iterator[str]:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        # Same litellm backend crewai's LLM.call uses, with its settings read off self.llm
+        stream = completion(
+            model=self.llm.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.llm.temperature,
+            max_tokens=self.llm.max_tokens,
+            api_key=self.llm.api_key,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _prepare_prompt(
+        self,
+        query: str,
+        max_chunks: int,
+        max_context_chars: int,
+        top_k: int,
+        query_vector: Optional[np.ndarray],
+        rerank: bool
+    ) -> Tuple[Optional[RAGResult], str, List[Dict[str, Any]], int]:
+        """Retrieval and prompt assembly shared by the blocking and streaming paths"""
+        
+        if not query.strip():
+            return RAGResult(
+                query=query,
+                response="Please provide a valid question.",
+                sources_used=[],
+                retrieval_count=0
+            ), "", [], 0
+        
+        # Step 1: Retrieve relevant chunks
+        if query_vector is None:
+            query_vector = self.embedding_generator.generate_query_embedding(query)
+        # With a reranker, oversample candidates and let the cross-encoder pick the top_k
+        use_reranker = self.reranker is not None and rerank
+        search_results = self.vector_db.search(
+            query_vector=query_vector,
+            limit=top_k * self.rerank_oversample if use_reranker else top_k
+        )
+        if use_reranker:
+            search_results = self.reranker.rerank(query, search_results, top_k)
+        
+        if not search_results:
+            return RAGResult(
+                query=query,
+                response="I couldn't find any relevant information in the available documents to answer your question.",
+                sources_used=[],
+                retrieval_count=0
+            ), "", [], 0
+        
+        # Step 2: Format context with citations
+        context, sources_info = self._format_context_with_citations(
+            search_results, max_chunks, max_context_chars
+        )
+        
+        # Step 3: Create citation-aware prompt
+        prompt = self._create_rag_prompt(query, context)
+        
+        return None, prompt, sources_info, len(search_results)
+    
     def _format_context_with_citations(
         self,
         search_results: List[Dict[str, Any]],
@@ -128,30 +295,36 @@ class RAGGenerator:
         max_context_chars: int
     ) -> Tuple[str, List[Dict[str, Any]]]:
 
+        candidates = search_results[:max_chunks]
+        if not candidates:
+            return "", []
+        
+        # Length of each "[i] content" entry, scanned once to find how many fit the budget
+        chunk_lengths = np.fromiter(
+            (len(result['content']) + len(str(i + 1)) + 3 for i, result in enumerate(candidates)),
+            dtype=np.int64,
+            count=len(candidates)
+        )
+        cumulative_chars = np.cumsum(chunk_lengths)
+        n_keep = max(1, int(np.searchsorted(cumulative_chars, max_context_chars, side='right')))
+        
+        # Relevance decides which chunks make the cut, document position decides their order:
+        # questions that retrieve the same chunks then send byte-identical prompt prefixes
+        kept = sorted(candidates[:n_keep], key=_document_order)
+        
         context_parts = []
         sources_info = []
-        total_chars = 0
-        for i, result in enumerate(search_results[:max_chunks]):
+        for i, result in enumerate(kept):
             citation_info = result['citation']
-            source_file = citation_info.get('source_file', 'Unknown Source')
-            source_type = citation_info.get('source_type', 'unknown')
-            page_number = citation_info.get('page_number')
-            
+            get_citation = citation_info.get
             citation_ref = f"[{i+1}]"
-            chunk_content = result['content']
-            chunk_text = f"{citation_ref} {chunk_content}"
-            
-            if total_chars + len(chunk_text) > max_context_chars and context_parts:
-                break
-            
-            context_parts.append(chunk_text)
-            total_chars += len(chunk_text)
+            context_parts.append(f"{citation_ref} {result['content']}")
             
             source_info = {
                 'reference': citation_ref,
-                'source_file': source_file,
-                'source_type': source_type,
-                'page_number': page_number,
+                'source_file': get_citation('source_file', 'Unknown Source'),
+                'source_type': get_citation('source_type', 'unknown'),
+                'page_number': get_citation('page_number'),
                 'chunk_id': result['id'],
                 'relevance_score': result['score']
             }
@@ -162,23 +335,9 @@ class RAGGenerator:
         return formatted_context, sources_info
     
     def _create_rag_prompt(self, query: str, context: str) -> str:
-        prompt = f"""You are an AI assistant that answers questions based on provided source material. You must follow these citation rules:
-
-CITATION REQUIREMENTS:
-1. For each factual claim in your answer, include the citation reference number in square brackets [1], [2], etc.
-2. Only use information from the provided context - do not add external knowledge
-3. If you cannot find relevant information in the context, say so clearly
-4. Be precise and accurate in your citations
-5. When multiple sources support the same point, list all relevant citations like this [1], [2], [3].
-
-CONTEXT (with citation references):
-{context}
-
-QUESTION: {query}
-
-Please provide a comprehensive answer with proper citations. Make sure every factual statement is supported by a citation reference."""
-        
-        return prompt
+        # The instructions alone are under OpenAI's 1024-token caching minimum; together with
+        # the ordered context they form the cacheable prefix, so the question stays last
+        return _RAG_PROMPT.format(context=context, query=query)
     
     def generate_summary(
         self,
@@ -186,10 +345,11 @@ Please provide a comprehensive answer with proper citations. Make sure every fac
         summary_length: str = "medium"
     ) -> RAGResult:
         try:
-            summary_query = "main topics key findings important information overview"
-            query_vector = self.embedding_generator.generate_query_embedding(summary_query)
+            if self._summary_query_vector is None:
+                self._summary_query_vector = self.embedding_generator.generate_query_embedding(_SUMMARY_QUERY)
+            query_vector = self._summary_query_vector
             search_results = self.vector_db.search(
-                query_vector=query_vector.tolist(),
+                query_vector=query_vector,
                 limit=max_chunks
             )
             
@@ -205,32 +365,21 @@ Please provide a comprehensive answer with proper citations. Make sure every fac
                 search_results, max_chunks, 6000
             )
             
-            length_instructions = {
-                'short': "Provide a concise 2-3 paragraph summary highlighting the most important points.",
-                'medium': "Provide a comprehensive 4-5 paragraph summary covering key topics and findings.",
-                'long': "Provide a detailed summary with multiple sections covering all major topics and supporting details."
-            }
-            
-            summary_prompt = f"""You are tasked with creating a summary of the provided document content. Follow these guidelines:
-
-1. {length_instructions.get(summary_length, length_instructions['medium'])}
-2. Include citations [1], [2], etc. for all factual claims
-3. Organize information logically with clear topics
-4. Focus on the most important and relevant information
-5. Maintain accuracy and cite sources properly
-
-DOCUMENT CONTENT (with citation references):
-{context}
-
-Please provide a well-structured summary with proper citations:"""
+            summary_prompt = _SUMMARY_PROMPT_TMPL.format(
+                length_instruction=_SUMMARY_LENGTH_INSTRUCTIONS.get(
+                    summary_length, _SUMMARY_LENGTH_INSTRUCTIONS['medium']
+                ),
+                context=context
+            )
             
-            response = self.llm.call(summary_prompt)
+            response = self._call_llm(summary_prompt)
             
             return RAGResult(
                 query="Document Summary",
                 response=response,
                 sources_used=sources_info,
-                retrieval_count=len(search_results)
+                retrieval_count=len(search_results),
+                model_name=self.model_name
             )
             
         except Exception as e:
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Random-projection LSH cache that returns stored values for near-duplicate query embeddings"""
+    
+    def __init__(
+        self,
+        dim: int,
+        threshold: float = 0.95,
+        hash_tables: int = 8,
+        hash_bits: int = 12,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        seed: int = 0
+    ):
+        self.dim = dim
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        
+        rng = np.random.default_rng(seed)
+        # One (dim, bits) gaussian projection per table; the sign pattern is the bucket key
+        self._projections = rng.standard_normal((hash_tables, dim, hash_bits)).astype(np.float32)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(hash_tables)]
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Any, float, List[bytes]]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _hash(self, unit: np.ndarray) -> List[bytes]:
+        signs = np.einsum('d,tdb->tb', unit, self._projections) > 0
+        return [np.packbits(row).tobytes() for row in signs]
+    
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+    
+    def get(self, vector: np.ndarray) -> Optional[Any]:
+        unit = self._normalize(vector)
+        keys = self._hash(unit)
+        now = time.monotonic()
+        
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._buckets, keys):
+                candidates.update(table.get(key, ()))
+            
+            best_id, best_score = None, self.threshold
+            for entry_id in candidates:
+                stored, _, created, _ = self._entries[entry_id]
+                if now - created > self.ttl:
+                    self._evict(entry_id)
+                    continue
+                score = float(stored @ unit)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            
+            if best_id is None:
+                return None
+            self._entries.move_to_end(best_id)
+            logger.info(f"Semantic cache hit (cosine={best_score:.3f})")
+            return self._entries[best_id][1]
+    
+    def put(self, vector: np.ndarray, value: Any):
+        unit = self._normalize(vector)
+        keys = self._hash(unit)
+        
+        with self._lock:
+            self._evict_expired()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (unit, value, time.monotonic(), keys)
+            for table, key in zip(self._buckets, keys):
+                table.setdefault(key, []).append(entry_id)
+            
+            while len(self._entries) > self.maxsize:
+                self._evict(next(iter(self._entries)))
+    
+    def _evict_expired(self):
+        # Entries found by get() are evicted there; this catches the ones no lookup reaches
+        now = time.monotonic()
+        expired = [
+            entry_id for entry_id, (_, _, created, _) in self._entries.items()
+            if now - created > self.ttl
+        ]
+        for entry_id in expired:
+            self._evict(entry_id)
+    
+    def _evict(self, entry_id: int):
+        _, _, _, keys = self._entries.pop(entry_id)
+        for table, key in zip(self._buckets, keys):
+            bucket = table.get(key)
+            if bucket:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del table[key]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for table in self._buckets:
+                table.clear()
@@ -1,11 +1,23 @@
+import asyncio
+import atexit
+import hashlib
+import json
 import logging
+import math
 import os
+import queue
+import re
+import threading
 import time
-from typing import Optional, Any, Dict, List
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, Dict, List, Tuple
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 
-from zep_cloud.client import Zep
+from zep_cloud.client import AsyncZep, Zep
+from zep_cloud.types import Message
 from zep_crewai import ZepUserStorage
 from crewai.memory.external.external_memory import ExternalMemory
 from src.generation.rag import RAGResult
@@ -13,6 +25,136 @@ from src.generation.rag import RAGResult
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shorter messages carry too little to be worth indexing or searching for
+_MIN_SIGNAL_WORDS = 3
+
+_LOW_SIGNAL_PHRASES = frozenset({
+    "hi", "hello", "hey", "ok", "okay", "thanks", "thank you", "thx", "cool",
+    "great", "nice", "got it", "sure", "yes", "no", "bye", "goodbye"
+})
+
+
+def _is_low_signal(text: str) -> bool:
+    """Write-side gate for turns that carry nothing worth indexing; reads go through _should_retrieve"""
+    normalized = text.lower().strip('.!? ')
+    return len(normalized.split()) < _MIN_SIGNAL_WORDS or normalized in _LOW_SIGNAL_PHRASES
+
+
+# Greetings and acknowledgements, optionally followed by punctuation
+_SKIP_RE = re.compile(
+    r'^(?:' + '|'.join(re.escape(p) for p in sorted(_LOW_SIGNAL_PHRASES, key=len, reverse=True)) + r')[\s.!?]*$',
+    re.IGNORECASE
+)
+# Bare arithmetic such as "12 * (3 + 4)" never benefits from conversation memory
+_ARITHMETIC_RE = re.compile(r'^[\d\s.+\-*/%^()=?]+$')
+
+
+def _should_retrieve(query: str, tool_use: bool = False) -> bool:
+    """Read-side gate: decide whether a query is worth a memory search round-trip"""
+    if tool_use:
+        return False
+    stripped = query.strip()
+    if _SKIP_RE.match(stripped) or _ARITHMETIC_RE.match(stripped):
+        return False
+    return len(stripped.split()) >= _MIN_SIGNAL_WORDS
+
+
+class _TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: bytes, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _select_memories(memories: List[Dict[str, Any]], limit: int, min_score: float) -> List[Dict[str, Any]]:
+    """Keep memories whose raw score clears min_score, relaxing the floor once when nothing does"""
+    for floor in (min_score, min_score * 0.5):
+        # Zep doesn't always score episodes; an unscored one can't be judged, so it stays
+        selected = [
+            m for m in memories
+            if m["relevance_score"] is None or m["relevance_score"] >= floor
+        ]
+        if selected:
+            return selected[:limit]
+    # Weak matches beat silently dropping all memory context
+    return memories[:limit]
+
+
+def _near_duplicate_episodes(episodes, similarity_threshold: float) -> List[Any]:
+    ordered = sorted(
+        (ep for ep in (episodes or []) if ep.content),
+        key=lambda ep: ep.created_at or "",
+        reverse=True
+    )
+    
+    # Greedy single-linkage clustering on word-level Jaccard similarity
+    clusters: List[List[Tuple[Any, set]]] = []
+    for ep in ordered:
+        words = set(ep.content.lower().split())
+        for cluster in clusters:
+            if any(_jaccard(words, other) >= similarity_threshold for _, other in cluster):
+                cluster.append((ep, words))
+                break
+        else:
+            clusters.append([(ep, words)])
+    
+    # The first member of each cluster is the newest, keep it as the canonical memory
+    return [ep for cluster in clusters for ep, _ in cluster[1:]]
+
+
+def _messages_indexed(messages, expected_contents: Tuple[str, ...]) -> bool:
+    """True once the last saved turn is visible in the thread and every fetched message is processed"""
+    if not expected_contents:
+        # Nothing has been saved by this layer, so there is nothing to wait for
+        return True
+    messages = messages or []
+    present = {m.content for m in messages}
+    if any(content not in present for content in expected_contents):
+        return False
+    # A missing or None flag means the SDK can't confirm processing, so keep polling
+    return all(getattr(m, 'processed', None) is True for m in messages)
+
+
+# Layers with a background save worker; pending turns are flushed before the interpreter exits
+_OPEN_LAYERS: "weakref.WeakSet[NotebookMemoryLayer]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_layers():
+    for layer in list(_OPEN_LAYERS):
+        layer.close()
+
 
 @dataclass
 class ConversationTurn:
@@ -24,7 +166,198 @@ class ConversationTurn:
     session_id: str
 
 
-class NotebookMemoryLayer:
+class _MemoryLayerBase:
+    """State and Zep-independent helpers shared by the sync and async memory layers"""
+    
+    def _init_state(
+        self,
+        user_id: str,
+        session_id: str,
+        indexing_wait_time: int,
+        consolidation_interval: int,
+        memory_decay_seconds: float,
+        window_stride: int,
+        window_size: int
+    ):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.indexing_wait_time = indexing_wait_time
+        self.consolidation_interval = consolidation_interval
+        self.memory_decay_seconds = memory_decay_seconds
+        self._turn_count = 0
+        self.window_stride = window_stride
+        self.window_size = window_size
+        self._recent_turns = deque(maxlen=window_size)
+        self._last_turn_contents: Tuple[str, ...] = ()
+        
+        # Guards turn counters, the recent-turn window and the context cache, which the
+        # save path updates while readers on other threads consult them
+        self._state_lock = threading.Lock()
+        
+        # Conversation context only changes when a turn is saved
+        self._turn_version = 0
+        self._context_cache: Optional[Tuple[int, str]] = None
+        self._memory_search_cache = _TTLCache(maxsize=1024, ttl=60.0)
+    
+    def _build_turn_messages(
+        self,
+        rag_result: RAGResult,
+        user_metadata: Optional[Dict[str, Any]] = None,
+        assistant_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Message]:
+        ts = datetime.now(timezone.utc).isoformat()
+        user_meta = {
+            "type": "message",
+            "role": "user", 
+            "timestamp": ts,
+            "session_id": self.session_id,
+            **(user_metadata or {})
+        }
+        
+        assistant_meta = {
+            "type": "message",
+            "role": "assistant",
+            "timestamp": ts,
+            "session_id": self.session_id,
+            "sources_count": len(rag_result.sources_used),
+            "retrieval_count": rag_result.retrieval_count,
+            "model_used": rag_result.model_name,
+            "sources_summary": self._create_sources_summary(rag_result.sources_used),
+            **(assistant_metadata or {})
+        }
+        # Sources ride on the assistant message so the thread only ever holds conversation turns
+        source_context = self._create_source_context(rag_result.sources_used)
+        if source_context:
+            assistant_meta["source_context"] = source_context
+        
+        return [
+            Message(role="user", content=rag_result.query, metadata=user_meta),
+            Message(role="assistant", content=rag_result.response, metadata=assistant_meta)
+        ]
+    
+    def _record_saved_turn(self, rag_result: RAGResult) -> int:
+        """Record a persisted turn and return the new turn count"""
+        with self._state_lock:
+            self._turn_version += 1
+            self._context_cache = None
+            self._turn_count += 1
+            self._recent_turns.append((rag_result.query, rag_result.response))
+            self._last_turn_contents = (rag_result.query, rag_result.response)
+            return self._turn_count
+    
+    def _window_text(self) -> Tuple[str, int]:
+        """Recent turns rendered as one transcript, and how many turns it spans"""
+        with self._state_lock:
+            turns = list(self._recent_turns)
+        text = "\n".join(
+            f"User: {query}\nAssistant: {response}"
+            for query, response in turns
+        )
+        return text, len(turns)
+    
+    def _create_sources_summary(self, sources_used: List[Dict[str, Any]]) -> str:
+        if not sources_used:
+            return "No sources used"
+        
+        source_files, source_types = set(), set()
+        first_three = []
+        for source in sources_used:
+            source_file = source.get('source_file', 'Unknown')
+            if len(first_three) < 3 and source_file not in source_files:
+                first_three.append(source_file)
+            source_files.add(source_file)
+            source_types.add(source.get('source_type', 'unknown'))
+        
+        file_count = len(source_files)
+        summary = f"{file_count} files ({', '.join(source_types)}): {', '.join(first_three)}"
+        if file_count > 3:
+            summary += f" and {file_count - 3} more"
+        
+        return summary
+    
+    def _create_source_context(self, sources_used: List[Dict[str, Any]]) -> Optional[str]:
+        referenced_documents = []
+        document_types = set()
+        for source in sources_used:
+            source_file = source.get('source_file')
+            if not source_file:
+                continue
+            
+            source_type = source.get('source_type', 'unknown')
+            referenced_documents.append({
+                "file": source_file,
+                "type": source_type,
+                "page": source.get('page_number'),
+                "relevance": source.get('relevance_score', 0)
+            })
+            document_types.add(source_type)
+        
+        if not referenced_documents:
+            return None
+        
+        source_context = {
+            "referenced_documents": referenced_documents,
+            "document_types": list(document_types),
+            "key_topics_discussed": []
+        }
+        
+        return json.dumps(source_context, separators=(",", ":"))
+    
+    def _invalidate_context_cache(self):
+        with self._state_lock:
+            self._turn_version += 1
+            self._context_cache = None
+    
+    def _cached_context(self) -> Tuple[int, Optional[str]]:
+        """Current turn version and the context cached for it, if any"""
+        with self._state_lock:
+            cached = self._context_cache
+            if cached and cached[0] == self._turn_version:
+                return self._turn_version, cached[1]
+            return self._turn_version, None
+    
+    def _store_context(self, version: int, context: str):
+        with self._state_lock:
+            # A turn saved while the request was in flight makes this result stale
+            if version == self._turn_version:
+                self._context_cache = (version, context)
+    
+    def _memory_cache_key(self, query: str, limit: int, min_score: float) -> bytes:
+        return hashlib.sha256(f"{self.user_id}:{query}:{limit}:{min_score}".encode()).digest()[:16]
+    
+    def _memories_from_episodes(self, episodes) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        ranked = []
+        for ep in episodes or []:
+            score = getattr(ep, 'score', None)
+            memory_info = {
+                "content": ep.content if ep.content else "",
+                "role": ep.role_type if ep.role_type else "unknown",
+                "relevance_score": score,
+                "thread_id": ep.thread_id if ep.thread_id else None,
+                "session_id": ep.session_id if ep.session_id else None,
+                "timestamp": ep.created_at if ep.created_at else None,
+            }
+            # Decay only orders the results; the min_score floor sees the raw Zep score
+            ranked.append((self._apply_recency_decay(score or 0.0, ep.created_at, now), memory_info))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [memory_info for _, memory_info in ranked]
+    
+    def _apply_recency_decay(self, score: float, created_at: Optional[str], now: datetime) -> float:
+        if not created_at or not self.memory_decay_seconds:
+            return score
+        try:
+            created = datetime.fromisoformat(created_at)
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)
+        except ValueError:
+            return score
+        
+        age_seconds = max(0.0, (now - created).total_seconds())
+        return score * math.exp(-age_seconds / self.memory_decay_seconds)
+
+
+class NotebookMemoryLayer(_MemoryLayerBase):
     def __init__(
         self,
         user_id: str,
@@ -32,11 +365,18 @@ class NotebookMemoryLayer:
         zep_api_key: Optional[str] = None,
         mode: str = "summary",
         indexing_wait_time: int = 10,
-        create_new_session: bool = False
+        create_new_session: bool = False,
+        background_saves: bool = True,
+        consolidation_interval: int = 50,
+        memory_decay_seconds: float = 7 * 24 * 3600,
+        window_stride: int = 3,
+        window_size: int = 5
     ):
-        self.user_id = user_id
-        self.session_id = session_id
-        self.indexing_wait_time = indexing_wait_time
+        self._init_state(
+            user_id, session_id, indexing_wait_time, consolidation_interval,
+            memory_decay_seconds, window_stride, window_size
+        )
+        self.background_saves = background_saves
         self.zep_client = Zep(api_key=zep_api_key or os.getenv("ZEP_API_KEY"))
         
         self._setup_user_and_session(create_new_session)
@@ -49,6 +389,22 @@ class NotebookMemoryLayer:
         )
         self.external_memory = ExternalMemory(storage=self.user_storage)
         
+        # Turn saves are drained off the request path by a daemon worker; close() (also run
+        # at interpreter exit) flushes whatever is still queued
+        self._save_queue = queue.Queue()
+        self._save_thread = None
+        self._closed = False
+        # Orders enqueues against close() so nothing lands behind the worker's stop sentinel
+        self._queue_lock = threading.Lock()
+        if self.background_saves:
+            self._save_thread = threading.Thread(target=self._save_worker, daemon=True)
+            self._save_thread.start()
+            _OPEN_LAYERS.add(self)
+        
+        # Consolidation deletes episodes and can take a while, so it never runs on the save path
+        self._maintenance_executor = ThreadPoolExecutor(max_workers=1)
+        self._consolidation_pending = threading.Event()
+        
         logger.info(f"NotebookMemoryLayer initialized for user {user_id}, session {session_id}")
     
     def _setup_user_and_session(self, create_new_session: bool):
@@ -88,90 +444,109 @@ class NotebookMemoryLayer:
         rag_result: RAGResult,
         user_metadata: Optional[Dict[str, Any]] = None,
         assistant_metadata: Optional[Dict[str, Any]] = None
+    ):
+        if _is_low_signal(rag_result.query) and _is_low_signal(rag_result.response):
+            logger.info("Skipping low-signal conversation turn")
+            return
+        
+        with self._queue_lock:
+            if self.background_saves and not self._closed:
+                self._save_queue.put((rag_result, user_metadata, assistant_metadata))
+                # Context fetched before the worker persists this turn must not be cached
+                self._invalidate_context_cache()
+                return
+        
+        # Once close() has stopped the worker, saves go straight to Zep
+        self._do_save(rag_result, user_metadata, assistant_metadata)
+    
+    def _save_worker(self):
+        while True:
+            item = self._save_queue.get()
+            if item is None:
+                self._save_queue.task_done()
+                return
+            rag_result, user_metadata, assistant_metadata = item
+            try:
+                self._do_save(rag_result, user_metadata, assistant_metadata)
+            except Exception:
+                # Already logged by _do_save, keep the worker alive for later turns
+                pass
+            finally:
+                self._save_queue.task_done()
+    
+    def flush(self):
+        """Block until every queued conversation turn has been sent to Zep"""
+        self._save_queue.join()
+    
+    def close(self):
+        """Flush pending turns, stop the save worker and wait for any running consolidation"""
+        with self._queue_lock:
+            if self._closed:
+                return
+            self._closed = True
+        _OPEN_LAYERS.discard(self)
+        if self._save_thread is not None:
+            self.flush()
+            self._save_queue.put(None)
+            self._save_thread.join()
+        self._maintenance_executor.shutdown(wait=True)
+    
+    def _do_save(
+        self,
+        rag_result: RAGResult,
+        user_metadata: Optional[Dict[str, Any]] = None,
+        assistant_metadata: Optional[Dict[str, Any]] = None
     ):
         try:
-            user_meta = {
-                "type": "message",
-                "role": "user", 
-                "timestamp": datetime.now().isoformat(),
-                "session_id": self.session_id,
-                **(user_metadata or {})
-            }
-            
-            # Save user message
-            self.external_memory.save(
-                rag_result.query,
-                metadata=user_meta
-            )
+            messages = self._build_turn_messages(rag_result, user_metadata, assistant_metadata)
             
-            assistant_meta = {
-                "type": "message",
-                "role": "assistant",
-                "timestamp": datetime.now().isoformat(),
-                "session_id": self.session_id,
-                "sources_count": len(rag_result.sources_used),
-                "retrieval_count": rag_result.retrieval_count,
-                "model_used": getattr(rag_result, 'model_name', 'unknown'),
-                "sources_summary": self._create_sources_summary(rag_result.sources_used),
-                **(assistant_metadata or {})
-            }
-            
-            # Save assistant response
-            self.external_memory.save(
-                rag_result.response,
-                metadata=assistant_meta
-            )
-            self._save_source_context(rag_result.sources_used)
+            # One round-trip per turn instead of a separate save per message
+            self.zep_client.thread.add_messages(thread_id=self.session_id, messages=messages)
+            turn_count = self._record_saved_turn(rag_result)
             
             logger.info(f"Saved conversation turn with {len(rag_result.sources_used)} sources")
             
         except Exception as e:
             logger.error(f"Error saving conversation turn: {str(e)}")
             raise
-    
-    def _create_sources_summary(self, sources_used: List[Dict[str, Any]]) -> str:
-        if not sources_used:
-            return "No sources used"
         
-        source_files = list(set(source.get('source_file', 'Unknown') for source in sources_used))
-        source_types = list(set(source.get('source_type', 'unknown') for source in sources_used))
+        if self.window_stride and turn_count % self.window_stride == 0:
+            self._save_window_chunk(turn_count)
         
-        summary = f"{len(source_files)} files ({', '.join(source_types)}): {', '.join(source_files[:3])}"
-        if len(source_files) > 3:
-            summary += f" and {len(source_files) - 3} more"
-        
-        return summary
+        if self.consolidation_interval and turn_count % self.consolidation_interval == 0:
+            self._schedule_consolidation()
     
-    def _save_source_context(self, sources_used: List[Dict[str, Any]]):
-        if not sources_used:
+    def _schedule_consolidation(self):
+        # At most one consolidation queued or running at a time
+        if self._closed or self._consolidation_pending.is_set():
             return
+        self._consolidation_pending.set()
         
-        source_context = {
-            "referenced_documents": [],
-            "document_types": set(),
-            "key_topics_discussed": []
-        }
-        
-        for source in sources_used:
-            doc_info = {
-                "file": source.get('source_file', 'Unknown'),
-                "type": source.get('source_type', 'unknown'),
-                "page": source.get('page_number'),
-                "relevance": source.get('relevance_score', 0)
-            }
-            source_context["referenced_documents"].append(doc_info)
-            source_context["document_types"].add(doc_info["type"])
-        
-        source_context["document_types"] = list(source_context["document_types"])
+        def run():
+            try:
+                self.consolidate_memory()
+            finally:
+                self._consolidation_pending.clear()
         
-        self.external_memory.save(
-            f"Document sources referenced: {source_context}",
-            metadata={
-                "type": "source_context",
-                "category": "document_usage",
-                "session_id": self.session_id
-            }
-        )
+        self._maintenance_executor.submit(run)
+    
+    def _save_window_chunk(self, end_turn: int):
+        # Overlapping windows let facts that span several turns co-occur in one episode
+        try:
+            window_text, span = self._window_text()
+            self.external_memory.save(
+                window_text,
+                metadata={
+                    "type": "window_chunk",
+                    "span": span,
+                    "session_id": self.session_id,
+                    "end_turn": end_turn
+                }
+            )
+            logger.info(f"Saved window chunk covering last {span} turns")
+            
+        except Exception as e:
+            logger.error(f"Error saving window chunk: {str(e)}")
     
     def save_user_preferences(self, preferences: Dict[str, Any]):
         try:
@@ -206,45 +581,102 @@ class NotebookMemoryLayer:
             logger.error(f"Error saving document metadata: {str(e)}")
     
     def get_conversation_context(self) -> str:
+        version, cached = self._cached_context()
+        if cached is not None:
+            return cached
+        
         try:
             memory = self.zep_client.thread.get_user_context(thread_id=self.session_id)
-            return memory.context if memory.context else ""
+            context = memory.context if memory.context else ""
+            self._store_context(version, context)
+            return context
             
         except Exception as e:
             logger.error(f"Error getting conversation context: {str(e)}")
             return "No conversation context available"
     
-    def get_relevant_memory(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def get_relevant_memory(
+        self,
+        query: str,
+        limit: int = 5,
+        min_score: float = 0.35,
+        tool_use: bool = False
+    ) -> List[Dict[str, Any]]:
+        if not _should_retrieve(query, tool_use):
+            logger.info("Skipping memory retrieval for low-signal query")
+            return []
+        
+        cache_key = self._memory_cache_key(query, limit, min_score)
+        cached = self._memory_search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         try:
             # Use Zep's semantic graph search on memory
             results = self.zep_client.graph.search(
                 user_id=self.user_id,
                 query=query,
                 scope="episodes",
+                limit=limit,
             )
             
-            relevant_memories = []
-            for ep in results.episodes:
-                memory_info = {
-                    "content": ep.content if ep.content else "",
-                    "role": ep.role_type if ep.role_type else "unknown",
-                    "relevance_score": ep.score if hasattr(ep, 'score') else 0,
-                    "thread_id": ep.thread_id if ep.thread_id else None,
-                    "session_id": ep.session_id if ep.session_id else None,
-                    "timestamp": ep.created_at if ep.created_at else None,
-                }
-                relevant_memories.append(memory_info)
+            relevant_memories = _select_memories(
+                self._memories_from_episodes(results.episodes), limit, min_score
+            )
             
             logger.info(f"Retrieved {len(relevant_memories)} relevant memories for query")
+            self._memory_search_cache.put(cache_key, tuple(relevant_memories))
             return relevant_memories
             
         except Exception as e:
             logger.error(f"Error getting relevant memory: {str(e)}")
             return []
     
+    def consolidate_memory(self, lastn: int = 100, similarity_threshold: float = 0.85) -> int:
+        """Delete near-duplicate recent episodes, keeping the newest of each cluster"""
+        try:
+            response = self.zep_client.graph.episode.get_by_user_id(user_id=self.user_id, lastn=lastn)
+            duplicates = _near_duplicate_episodes(response.episodes, similarity_threshold)
+            for ep in duplicates:
+                self.zep_client.graph.episode.delete(uuid_=ep.uuid_)
+            
+            removed = len(duplicates)
+            if removed:
+                self._memory_search_cache.clear()
+            logger.info(f"Memory consolidation removed {removed} near-duplicate episodes")
+            return removed
+            
+        except Exception as e:
+            logger.error(f"Error consolidating memory: {str(e)}")
+            return 0
+    
     def wait_for_indexing(self):
-        logger.info(f"Waiting {self.indexing_wait_time}s for Zep indexing...")
-        time.sleep(self.indexing_wait_time)
+        self.flush()
+        logger.info(f"Waiting up to {self.indexing_wait_time}s for Zep indexing...")
+        
+        deadline = time.monotonic() + self.indexing_wait_time
+        delay = 0.05
+        while True:
+            if self._is_thread_indexed():
+                logger.info("Zep indexing complete")
+                return
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("Timed out waiting for Zep indexing")
+                return
+            
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
+    
+    def _is_thread_indexed(self, lastn: int = 10) -> bool:
+        try:
+            thread = self.zep_client.thread.get(thread_id=self.session_id, lastn=lastn)
+            return _messages_indexed(thread.messages, self._last_turn_contents)
+            
+        except Exception as e:
+            logger.debug(f"Could not check indexing status: {str(e)}")
+            return False
     
     def get_session_summary(self) -> Dict[str, Any]:
         try:
@@ -274,8 +706,264 @@ class NotebookMemoryLayer:
     
     def clear_session(self):
         try:
+            self.flush()
             self.zep_client.thread.delete(self.session_id)
             self.zep_client.thread.create(thread_id=self.session_id, user_id=self.user_id)
+            self._invalidate_context_cache()
+            self._memory_search_cache.clear()
+            logger.info(f"Session {self.session_id} cleared and recreated")
+            
+        except Exception as e:
+            logger.error(f"Error clearing session: {str(e)}")
+            raise
+
+
+class AsyncNotebookMemoryLayer(_MemoryLayerBase):
+    """Asyncio counterpart of NotebookMemoryLayer backed by Zep's async client"""
+    
+    def __init__(
+        self,
+        user_id: str,
+        session_id: str,
+        zep_api_key: Optional[str] = None,
+        indexing_wait_time: int = 10,
+        consolidation_interval: int = 50,
+        memory_decay_seconds: float = 7 * 24 * 3600,
+        window_stride: int = 3,
+        window_size: int = 5
+    ):
+        # No network I/O here, await setup() (or use create()) before first use
+        self._init_state(
+            user_id, session_id, indexing_wait_time, consolidation_interval,
+            memory_decay_seconds, window_stride, window_size
+        )
+        self.zep_client = AsyncZep(api_key=zep_api_key or os.getenv("ZEP_API_KEY"))
+        self._consolidation_task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    async def create(cls, *args, create_new_session: bool = False, **kwargs) -> "AsyncNotebookMemoryLayer":
+        layer = cls(*args, **kwargs)
+        await layer.setup(create_new_session)
+        return layer
+    
+    async def setup(self, create_new_session: bool = False):
+        try:
+            try:
+                await self.zep_client.user.get(self.user_id)
+                logger.info(f"Using existing user: {self.user_id}")
+            except Exception:
+                await self.zep_client.user.add(user_id=self.user_id)
+                logger.info(f"Created new user: {self.user_id}")
+            
+            if create_new_session:
+                try:
+                    await self.zep_client.thread.delete(self.session_id)
+                    logger.info(f"Deleted previous session: {self.session_id}")
+                except Exception:
+                    pass
+                
+                await self.zep_client.thread.create(thread_id=self.session_id, user_id=self.user_id)
+                logger.info(f"Created new session: {self.session_id}")
+            else:
+                try:
+                    await self.zep_client.thread.get(self.session_id)
+                    logger.info(f"Using existing session: {self.session_id}")
+                except Exception:
+                    await self.zep_client.thread.create(thread_id=self.session_id, user_id=self.user_id)
+                    logger.info(f"Created session: {self.session_id}")
+            
+            logger.info(f"AsyncNotebookMemoryLayer initialized for user {self.user_id}, session {self.session_id}")
+            
+        except Exception as e:
+            logger.error(f"Error setting up user/session: {str(e)}")
+            raise
+    
+    async def save_conversation_turn(
+        self,
+        rag_result: RAGResult,
+        user_metadata: Optional[Dict[str, Any]] = None,
+        assistant_metadata: Optional[Dict[str, Any]] = None
+    ):
+        if _is_low_signal(rag_result.query) and _is_low_signal(rag_result.response):
+            logger.info("Skipping low-signal conversation turn")
+            return
+        
+        try:
+            messages = self._build_turn_messages(rag_result, user_metadata, assistant_metadata)
+            await self.zep_client.thread.add_messages(thread_id=self.session_id, messages=messages)
+            turn_count = self._record_saved_turn(rag_result)
+            
+            logger.info(f"Saved conversation turn with {len(rag_result.sources_used)} sources")
+            
+        except Exception as e:
+            logger.error(f"Error saving conversation turn: {str(e)}")
+            raise
+        
+        if self.window_stride and turn_count % self.window_stride == 0:
+            await self._save_window_chunk()
+        if self.consolidation_interval and turn_count % self.consolidation_interval == 0:
+            self._schedule_consolidation()
+    
+    def _schedule_consolidation(self):
+        # Runs as its own task so episode deletes never hold up the save
+        if self._consolidation_task is None or self._consolidation_task.done():
+            self._consolidation_task = asyncio.create_task(self.consolidate_memory())
+    
+    async def flush(self):
+        """Saves are awaited directly; only a scheduled consolidation can still be pending"""
+        if self._consolidation_task is not None:
+            await self._consolidation_task
+    
+    async def _save_text(self, text: str, label: str):
+        try:
+            await self.zep_client.graph.add(user_id=self.user_id, type="text", data=text)
+            logger.info(f"{label} saved to memory")
+            
+        except Exception as e:
+            logger.error(f"Error saving {label.lower()}: {str(e)}")
+    
+    async def _save_window_chunk(self):
+        window_text, _ = self._window_text()
+        await self._save_text(window_text, "Window chunk")
+    
+    async def save_user_preferences(self, preferences: Dict[str, Any]):
+        await self._save_text(f"User preferences: {preferences}", "User preferences")
+    
+    async def save_document_metadata(self, document_info: Dict[str, Any]):
+        await self._save_text(f"Document processed: {document_info}", "Document metadata")
+    
+    async def get_conversation_context(self) -> str:
+        version, cached = self._cached_context()
+        if cached is not None:
+            return cached
+        
+        try:
+            memory = await self.zep_client.thread.get_user_context(thread_id=self.session_id)
+            context = memory.context if memory.context else ""
+            self._store_context(version, context)
+            return context
+            
+        except Exception as e:
+            logger.error(f"Error getting conversation context: {str(e)}")
+            return "No conversation context available"
+    
+    async def get_relevant_memory(
+        self,
+        query: str,
+        limit: int = 5,
+        min_score: float = 0.35,
+        tool_use: bool = False
+    ) -> List[Dict[str, Any]]:
+        if not _should_retrieve(query, tool_use):
+            logger.info("Skipping memory retrieval for low-signal query")
+            return []
+        
+        cache_key = self._memory_cache_key(query, limit, min_score)
+        cached = self._memory_search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        try:
+            results = await self.zep_client.graph.search(
+                user_id=self.user_id,
+                query=query,
+                scope="episodes",
+                limit=limit,
+            )
+            
+            relevant_memories = _select_memories(
+                self._memories_from_episodes(results.episodes), limit, min_score
+            )
+            
+            logger.info(f"Retrieved {len(relevant_memories)} relevant memories for query")
+            self._memory_search_cache.put(cache_key, tuple(relevant_memories))
+            return relevant_memories
+            
+        except Exception as e:
+            logger.error(f"Error getting relevant memory: {str(e)}")
+            return []
+    
+    async def consolidate_memory(self, lastn: int = 100, similarity_threshold: float = 0.85) -> int:
+        """Delete near-duplicate recent episodes, keeping the newest of each cluster"""
+        try:
+            response = await self.zep_client.graph.episode.get_by_user_id(user_id=self.user_id, lastn=lastn)
+            duplicates = _near_duplicate_episodes(response.episodes, similarity_threshold)
+            await asyncio.gather(*(
+                self.zep_client.graph.episode.delete(uuid_=ep.uuid_) for ep in duplicates
+            ))
+            
+            removed = len(duplicates)
+            if removed:
+                self._memory_search_cache.clear()
+            logger.info(f"Memory consolidation removed {removed} near-duplicate episodes")
+            return removed
+            
+        except Exception as e:
+            logger.error(f"Error consolidating memory: {str(e)}")
+            return 0
+    
+    async def wait_for_indexing(self):
+        logger.info(f"Waiting up to {self.indexing_wait_time}s for Zep indexing...")
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.indexing_wait_time
+        delay = 0.05
+        while True:
+            if await self._is_thread_indexed():
+                logger.info("Zep indexing complete")
+                return
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning("Timed out waiting for Zep indexing")
+                return
+            
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
+    
+    async def _is_thread_indexed(self, lastn: int = 10) -> bool:
+        try:
+            thread = await self.zep_client.thread.get(thread_id=self.session_id, lastn=lastn)
+            return _messages_indexed(thread.messages, self._last_turn_contents)
+            
+        except Exception as e:
+            logger.debug(f"Could not check indexing status: {str(e)}")
+            return False
+    
+    async def get_session_summary(self) -> Dict[str, Any]:
+        try:
+            # Thread history and user context are independent round-trips
+            messages, context = await asyncio.gather(
+                self.zep_client.thread.get(thread_id=self.session_id),
+                self.get_conversation_context()
+            )
+            
+            if not messages or not messages.messages:
+                return {"message_count": 0, "summary": "No messages in session"}
+            
+            user_messages = [m for m in messages.messages if m.role == "user"]
+            assistant_messages = [m for m in messages.messages if m.role == "assistant"]
+            
+            return {
+                "session_id": self.session_id,
+                "user_id": self.user_id,
+                "total_messages": len(messages.messages),
+                "user_messages": len(user_messages),
+                "assistant_messages": len(assistant_messages),
+                "context_available": bool(context),
+                "last_interaction": messages.messages[0].created_at
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting session summary: {str(e)}")
+            return {"error": str(e)}
+    
+    async def clear_session(self):
+        try:
+            await self.zep_client.thread.delete(self.session_id)
+            await self.zep_client.thread.create(thread_id=self.session_id, user_id=self.user_id)
+            self._invalidate_context_cache()
+            self._memory_search_cache.clear()
             logger.info(f"Session {self.session_id} cleared and recreated")
             
         except Exception as e:
@@ -1,11 +1,16 @@
 import logging
 import os
+import re
+import threading
+import numpy as np
 import soundfile as sf
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
 
 try:
+    import torch
     from kokoro import KPipeline
 except ImportError:
     print("Kokoro not installed. Install with: pip install kokoro>=0.9.4")
@@ -16,31 +21,59 @@ from src.podcast.script_generator import PodcastScript
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Collapses runs of repeated '.', '!' or '?' in a single pass
+_REPEATED_PUNCTUATION_RE = re.compile(r'\.{3,}|!!+|\?\?+')
+
+DEFAULT_VOICE = "af_heart"
+SPEAKER_VOICES = {
+    "Speaker 1": "af_heart",  # Female voice
+    "Speaker 2": "am_liam"    # Male voice
+}
+
 
 @dataclass
 class AudioSegment:
     """Represents a single audio segment with metadata"""
     speaker: str
     text: str
-    audio_data: Any
     duration: float
     file_path: str
 
 
 class PodcastTTSGenerator:
-    def __init__(self, lang_code: str = 'a', sample_rate: int = 24000):
+    def __init__(
+        self,
+        lang_code: str = 'a',
+        sample_rate: int = 24000,
+        max_workers: Optional[int] = None,
+        device: Optional[str] = None,
+        use_fp16: bool = True
+    ):
         if KPipeline is None:
             raise ImportError("Kokoro TTS not available. Install with: pip install kokoro>=0.9.4 soundfile")
         
+        self.lang_code = lang_code
         self.sample_rate = sample_rate
-        self.pipeline = KPipeline(lang_code=lang_code)
-        
-        self.speaker_voices = {
-            "Speaker 1": "af_heart",  # Female voice
-            "Speaker 2": "am_liam"    # Male voice
-        }
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.device = device or self._detect_device()
+        # Autocast rather than .half() so voice packs and numerically sensitive ops stay in fp32
+        self.use_fp16 = use_fp16 and self.device == 'cuda'
+        self.pipeline = KPipeline(lang_code=lang_code, device=self.device)
+        self._thread_local = threading.local()
         
-        logger.info(f"Kokoro TTS initialized with lang_code='{lang_code}', sample_rate={sample_rate}")
+        logger.info(
+            f"Kokoro TTS initialized with lang_code='{lang_code}', sample_rate={sample_rate}, "
+            f"device={self.device}, fp16={self.use_fp16}"
+        )
+    
+    @staticmethod
+    def _detect_device() -> str:
+        if torch.cuda.is_available():
+            return 'cuda'
+        # Kokoro needs the CPU fallback for ops MPS doesn't implement yet
+        if torch.backends.mps.is_available() and os.getenv("PYTORCH_ENABLE_MPS_FALLBACK") == "1":
+            return 'mps'
+        return 'cpu'
     
     def generate_podcast_audio(
         self, 
@@ -54,37 +87,35 @@ class PodcastTTSGenerator:
         logger.info(f"Generating podcast audio for {podcast_script.total_lines} segments")
         logger.info(f"Output directory: {output_dir}")
         
-        audio_segments = []
-        output_files = []
+        segment_files = {}
+        audio_segments = {}
         
-        for i, line_dict in enumerate(podcast_script.script):
-            speaker, dialogue = next(iter(line_dict.items()))
-            
-            logger.info(f"Processing segment {i+1}/{podcast_script.total_lines}: {speaker}")
+        speaker_runs = self._group_speaker_runs(podcast_script.script)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for speaker, voice, lines in speaker_runs:
+                line_numbers = [i + 1 for i, _ in lines]
+                logger.info(f"Queueing segments {line_numbers} of {podcast_script.total_lines}: {speaker}")
+                future = executor.submit(self._generate_speaker_run, speaker, voice, lines, output_dir)
+                futures[future] = line_numbers
             
-            try:
-                segment_audio = self._generate_single_segment(speaker, dialogue)
-                segment_filename = f"segment_{i+1:03d}_{speaker.replace(' ', '_').lower()}.wav"
-                segment_path = os.path.join(output_dir, segment_filename)
-                
-                sf.write(segment_path, segment_audio, self.sample_rate)
-                output_files.append(segment_path)
-                
-                if combine_audio:
-                    audio_segment = AudioSegment(
-                        speaker=speaker,
-                        text=dialogue,
-                        audio_data=segment_audio,
-                        duration=len(segment_audio) / self.sample_rate,
-                        file_path=segment_path
-                    )
-                    audio_segments.append(audio_segment)
-                
-                logger.info(f"✓ Generated segment {i+1}: {segment_filename}")
-                
-            except Exception as e:
-                logger.error(f"✗ Failed to generate segment {i+1}: {str(e)}")
-                continue
+            for future in as_completed(futures):
+                line_numbers = futures[future]
+                try:
+                    for i, audio_segment in future.result():
+                        segment_files[i] = audio_segment.file_path
+                        if combine_audio:
+                            audio_segments[i] = audio_segment
+                        
+                        logger.info(f"✓ Generated segment {i+1}: {os.path.basename(audio_segment.file_path)}")
+                    
+                except Exception as e:
+                    logger.error(f"✗ Failed to generate segments {line_numbers}: {str(e)}")
+        
+        # Restore script order regardless of completion order
+        output_files = [segment_files[i] for i in sorted(segment_files)]
+        audio_segments = [audio_segments[i] for i in sorted(audio_segments)]
         
         if combine_audio and audio_segments:
             combined_path = self._combine_audio_segments(audio_segments, output_dir)
@@ -93,28 +124,87 @@ class PodcastTTSGenerator:
         logger.info(f"Podcast generation complete! Generated {len(output_files)} files")
         return output_files
     
+    def _get_thread_pipeline(self):
+        # G2P state isn't thread-safe, so each worker gets its own pipeline sharing the one model
+        pipeline = getattr(self._thread_local, 'pipeline', None)
+        if pipeline is None:
+            pipeline = KPipeline(lang_code=self.lang_code, model=self.pipeline.model, device=self.device)
+            self._thread_local.pipeline = pipeline
+        return pipeline
+    
+    def _group_speaker_runs(
+        self,
+        script: List[Dict[str, str]]
+    ) -> List[Tuple[str, str, List[Tuple[int, str]]]]:
+        # Consecutive lines from the same speaker share one pipeline call; the voice is resolved once per run
+        runs = []
+        for i, line_dict in enumerate(script):
+            speaker, dialogue = next(iter(line_dict.items()))
+            if runs and runs[-1][0] == speaker:
+                runs[-1][2].append((i, dialogue))
+            else:
+                runs.append((speaker, SPEAKER_VOICES.get(speaker, DEFAULT_VOICE), [(i, dialogue)]))
+        return runs
+    
+    def _generate_speaker_run(
+        self,
+        speaker: str,
+        voice: str,
+        lines: List[Tuple[int, str]],
+        output_dir: str
+    ) -> List[Tuple[int, AudioSegment]]:
+        line_audio = self._synthesize_lines(voice, [dialogue for _, dialogue in lines])
+        
+        segments = []
+        for (index, dialogue), segment_audio in zip(lines, line_audio):
+            segment_filename = f"segment_{index+1:03d}_{speaker.replace(' ', '_').lower()}.wav"
+            segment_path = os.path.join(output_dir, segment_filename)
+            
+            # Kokoro emits [-1, 1] floats; clip stray peaks so the 16-bit cast can't wrap
+            sf.write(segment_path, np.clip(segment_audio, -1.0, 1.0), self.sample_rate, subtype='PCM_16')
+            
+            segments.append((index, AudioSegment(
+                speaker=speaker,
+                text=dialogue,
+                duration=len(segment_audio) / self.sample_rate,
+                file_path=segment_path
+            )))
+        
+        return segments
+    
     def _generate_single_segment(self, speaker: str, text: str) -> Any:
-        voice = self.speaker_voices.get(speaker, "af_heart")
-        clean_text = self._clean_text_for_tts(text)
-
-        generator = self.pipeline(clean_text, voice=voice)
+        return self._synthesize_lines(SPEAKER_VOICES.get(speaker, DEFAULT_VOICE), [text])[0]
+    
+    def _synthesize_lines(self, voice: str, texts: List[str]) -> List[Any]:
+        clean_texts = [self._clean_text_for_tts(text) for text in texts]
         
-        combined_audio = []
-        for i, (gs, ps, audio) in enumerate(generator):
-            combined_audio.append(audio)
+        # A list input is synthesized line by line; text_index maps each result back to its line
+        generator = self._get_thread_pipeline()(clean_texts, voice=voice)
         
-        if len(combined_audio) == 1:
-            return combined_audio[0]
-        else:
-            import numpy as np
-            return np.concatenate(combined_audio)
+        # Most lines yield a single chunk, so only build a list once a second one shows up
+        first_chunks = [None] * len(clean_texts)
+        extra_chunks = [None] * len(clean_texts)
+        with torch.autocast(device_type='cuda', dtype=torch.float16, enabled=self.use_fp16):
+            for result in generator:
+                idx = result.text_index
+                audio = result.audio.float()
+                if first_chunks[idx] is None:
+                    first_chunks[idx] = audio
+                elif extra_chunks[idx] is None:
+                    extra_chunks[idx] = [audio]
+                else:
+                    extra_chunks[idx].append(audio)
+        
+        line_audio = []
+        for first, extras in zip(first_chunks, extra_chunks):
+            if first is None:
+                raise RuntimeError("Kokoro produced no audio for a script line")
+            line_audio.append(first if extras is None else np.concatenate([first, *extras]))
+        
+        return line_audio
     
     def _clean_text_for_tts(self, text: str) -> str:
-        clean_text = text.strip()
-
-        clean_text = clean_text.replace("...", ".")
-        clean_text = clean_text.replace("!!", "!")
-        clean_text = clean_text.replace("??", "?")
+        clean_text = _REPEATED_PUNCTUATION_RE.sub(lambda m: m.group()[0], text.strip())
 
         if not clean_text.endswith(('.', '!', '?')):
             clean_text += '.'
@@ -129,26 +219,28 @@ class PodcastTTSGenerator:
         logger.info(f"Combining {len(segments)} audio segments")
         
         try:
-            import numpy as np
-            
             pause_duration = 0.2  # seconds
             pause_samples = int(pause_duration * self.sample_rate)
             pause_audio = np.zeros(pause_samples, dtype=np.float32)
             
-            combined_audio = []
-            for i, segment in enumerate(segments):
-                combined_audio.append(segment.audio_data)
-                
-                if i < len(segments) - 1:
-                    combined_audio.append(pause_audio)
-            
-            final_audio = np.concatenate(combined_audio)
-            
             combined_filename = "complete_podcast.wav"
             combined_path = os.path.join(output_dir, combined_filename)
-            sf.write(combined_path, final_audio, self.sample_rate)
             
-            duration = len(final_audio) / self.sample_rate
+            # Stream segments from disk one at a time so peak memory stays at a single segment
+            total_samples = 0
+            with sf.SoundFile(
+                combined_path, 'w', samplerate=self.sample_rate, channels=1, subtype='PCM_16'
+            ) as sink:
+                for i, segment in enumerate(segments):
+                    segment_audio, _ = sf.read(segment.file_path, dtype='float32')
+                    sink.write(segment_audio)
+                    total_samples += len(segment_audio)
+                    
+                    if i < len(segments) - 1:
+                        sink.write(pause_audio)
+                        total_samples += pause_samples
+            
+            duration = total_samples / self.sample_rate
             logger.info(f"✓ Combined podcast saved: {combined_path} (Duration: {duration:.1f}s)")
             
             return combined_path
@@ -1,7 +1,16 @@
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
 import json
+import math
+import time
+import uuid
+from operator import itemgetter
 from pathlib import Path
+import numpy as np
 
 from pymilvus import MilvusClient, DataType, connections, utility
 from src.embeddings.embedding_generator import EmbeddedChunk
@@ -9,19 +18,72 @@ from src.embeddings.embedding_generator import EmbeddedChunk
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# nprobe multipliers over the ~1% of lists baseline
+_NPROBE_PROFILES = {"fast": 1, "balanced": 4, "recall-max": 16}
+
+# Filter templates are fixed strings, so Milvus can reuse the parsed plan and only bind values
+_IDS_FILTER = "id in {ids}"
+
+_QUANTIZATION_INDEX_TYPES = {"none": "IVF_FLAT", "sq8": "IVF_SQ8", "rabitq": "IVF_RABITQ"}
+
+
+def _normalize_rows(vecs: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length in place, so inner product equals cosine similarity"""
+    vecs /= np.linalg.norm(vecs, axis=-1, keepdims=True).clip(min=1e-12)
+    return vecs
+
+
+def _l2_to_similarity(distance: float) -> float:
+    # Milvus reports squared L2, which for unit vectors is 2 - 2 * cosine
+    return 1.0 - distance / 2.0
+
+# Metrics whose search distance already means "higher is more similar"
+_SIMILARITY_METRICS = ("IP", "COSINE")
+
+_SEARCH_OUTPUT_FIELDS = [
+    "content", "source_file", "source_type", "page_number",
+    "chunk_index", "start_char", "end_char", "embedding_model"
+]
+_get_entity_fields = itemgetter(*_SEARCH_OUTPUT_FIELDS)
+
+
 
 class MilvusVectorDB:
     def __init__(
         self, 
         db_path: str = "./milvus_lite.db",
         collection_name: str = "notebook_lm",
-        embedding_dim: int = 384
+        embedding_dim: int = 384,
+        insert_batch_size: int = 1000,
+        chunk_cache_size: int = 10_000,
+        insert_workers: int = 4,
+        use_float16: Optional[bool] = None
     ):
         self.db_path = db_path
         self.collection_name = collection_name
         self.embedding_dim = embedding_dim
+        self.insert_batch_size = insert_batch_size
+        self.insert_workers = max(1, insert_workers)
+        # FLOAT16_VECTOR halves insert payloads and raw vector storage; existing collections keep their type.
+        # Milvus Lite isn't known to support it, so the default there stays FLOAT_VECTOR
+        if use_float16 is None:
+            use_float16 = not self._is_milvus_lite()
+        self._vector_dtype = np.float16 if use_float16 else np.float32
         self.client = None
         self.collection_exists = False
+        self._index_type: Optional[str] = None
+        self._metric_type: Optional[str] = None
+        self.default_nprobe: Optional[int] = None
+        self._index_info_loaded = False
+        
+        # Chunk content is immutable once inserted, so resolved chunks can be cached by id
+        self.chunk_cache_size = chunk_cache_size
+        self._chunk_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._chunk_cache_lock = threading.Lock()
+        
+        # Nesting depth of begin_bulk(); the outermost exit issues the single flush
+        self._bulk_depth = 0
+        self._bulk_lock = threading.Lock()
         
         self._initialize_client()
         self._setup_collection()
@@ -40,11 +102,12 @@ class MilvusVectorDB:
             if self.client.has_collection(collection_name=self.collection_name):
                 logger.info(f"Collection '{self.collection_name}' already exists")
                 self.collection_exists = True
+                self._inspect_existing_schema()
                 return
             
             schema = self.client.create_schema(
                 auto_id=False,
-                enable_dynamic_field=True  # Allow additional metadata fields
+                enable_dynamic_field=False  # Every column is declared, extra data goes in metadata
             )
             
             # Primary key field (chunk_id)
@@ -58,7 +121,7 @@ class MilvusVectorDB:
             # Vector field for embeddings
             schema.add_field(
                 field_name="vector",
-                datatype=DataType.FLOAT_VECTOR,
+                datatype=DataType.FLOAT16_VECTOR if self._vector_dtype == np.float16 else DataType.FLOAT_VECTOR,
                 dim=self.embedding_dim
             )
             
@@ -101,6 +164,13 @@ class MilvusVectorDB:
                 datatype=DataType.INT32
             )
             
+            # Promoted out of metadata so citations can link back without decoding JSON
+            schema.add_field(
+                field_name="url",
+                datatype=DataType.VARCHAR,
+                max_length=2048
+            )
+            
             # JSON field for additional metadata
             schema.add_field(
                 field_name="metadata",
@@ -127,24 +197,60 @@ class MilvusVectorDB:
     
     def create_index(
         self,
-        use_binary_quantization: bool = False,
-        nlist: int = 1024,
-        enable_refine: bool = False,
-        refine_type: str = "SQ8"
+        quantization: Literal["none", "sq8", "rabitq"] = "sq8",
+        nlist: Optional[int] = None,
+        enable_refine: bool = True,
+        refine_type: str = "SQ8",
+        n_vectors: Optional[int] = None,
+        profile: str = "balanced",
+        use_binary_quantization: Optional[bool] = None,
+        metric_type: str = "IP",
+        force: bool = False
     ):
         try:
             if not self.collection_exists:
                 raise Exception("Collection does not exist. Setup collection first.")
             
+            # Incremental ingestion reuses the existing index; only force=True rebuilds it
+            rebuilding = self._has_vector_index()
+            if rebuilding:
+                if not force:
+                    logger.info("Vector index already exists, skipping index creation")
+                    if not self._index_info_loaded:
+                        self._load_index_info()
+                    return
+                self.client.release_collection(collection_name=self.collection_name)
+                self.client.drop_index(collection_name=self.collection_name, index_name="vector_index")
+                logger.info("Dropped existing vector index for rebuild")
+            if profile not in _NPROBE_PROFILES:
+                raise ValueError(f"Unknown search profile '{profile}', expected one of {list(_NPROBE_PROFILES)}")
+            if use_binary_quantization is not None:
+                # Older boolean toggle, kept for existing callers
+                quantization = "rabitq" if use_binary_quantization else "none"
+            if quantization not in _QUANTIZATION_INDEX_TYPES:
+                raise ValueError(f"Unknown quantization '{quantization}', expected one of {list(_QUANTIZATION_INDEX_TYPES)}")
+            
+            if nlist is None:
+                if n_vectors is None:
+                    stats = self.client.get_collection_stats(collection_name=self.collection_name)
+                    n_vectors = int(stats.get("row_count", 0))
+                nlist = max(128, int(math.sqrt(n_vectors)))
+            self.default_nprobe = self._nprobe_for(nlist, profile)
+            
             index_params = self.client.prepare_index_params()
             
-            if use_binary_quantization:
+            if quantization != "none" and self._is_milvus_lite():
+                logger.warning(f"Milvus Lite does not support {_QUANTIZATION_INDEX_TYPES[quantization]}, using IVF_FLAT instead")
+                quantization = "none"
+            index_type = _QUANTIZATION_INDEX_TYPES[quantization]
+            
+            if quantization == "rabitq":
                 # IVF_RABITQ with binary quantization
                 index_params.add_index(
                     field_name="vector",
                     index_type="IVF_RABITQ",
                     index_name="vector_index",
-                    metric_type="L2",
+                    metric_type=metric_type,
                     params={
                         "nlist": nlist,
                         "refine": enable_refine,
@@ -153,50 +259,106 @@ class MilvusVectorDB:
                 )
                 logger.info(f"Creating IVF_RABITQ index with nlist={nlist}, refine={enable_refine}")
             else:
-                # Fallback to IVF_FLAT if BQ not supported
+                # IVF_SQ8 keeps uint8 codes (4x smaller than float32), IVF_FLAT keeps full vectors
                 index_params.add_index(
                     field_name="vector",
-                    index_type="IVF_FLAT", 
+                    index_type=index_type,
                     index_name="vector_index",
-                    metric_type="L2",
-                    # params={"nlist": nlist}
+                    metric_type=metric_type,
+                    params={"nlist": nlist}
                 )
-                logger.info(f"Creating IVF_FLAT index with nlist={nlist}")
+                logger.info(f"Creating {index_type} index with nlist={nlist}")
             
             self.client.create_index(
                 collection_name=self.collection_name,
                 index_params=index_params
             )
+            if rebuilding:
+                self.client.load_collection(collection_name=self.collection_name)
+            self._index_type = index_type
+            self._metric_type = metric_type
             
-            logger.info("Index created successfully")
+            logger.info(f"Index created successfully, default nprobe={self.default_nprobe} ({profile})")
             
         except Exception as e:
             logger.error(f"Error creating index: {str(e)}")
             raise
     
-    def insert_embeddings(self, embedded_chunks: List[EmbeddedChunk]) -> List[str]:
+    def _has_vector_index(self) -> bool:
+        try:
+            return "vector_index" in self.client.list_indexes(collection_name=self.collection_name)
+        except Exception as e:
+            logger.debug(f"Could not list indexes: {str(e)}")
+            return False
+    
+    def _inspect_existing_schema(self):
+        # Collections created before float16 storage keep FLOAT_VECTOR
+        try:
+            description = self.client.describe_collection(collection_name=self.collection_name)
+        except Exception as e:
+            logger.warning(f"Could not inspect collection schema: {str(e)}")
+            return
+        
+        for field in description.get("fields", []):
+            if field.get("name") == "vector":
+                is_float16 = field.get("type") == DataType.FLOAT16_VECTOR
+                self._vector_dtype = np.float16 if is_float16 else np.float32
+            elif field.get("name") == "source_file" and field.get("type") == DataType.INT32:
+                # Integer-coded string columns can't be decoded reliably without their mapping
+                raise ValueError(
+                    f"Collection '{self.collection_name}' stores source_file as INT32 codes, which are "
+                    f"no longer supported; delete the collection and re-ingest"
+                )
+    
+    def _encode_rows(self, embedded_chunks: List[EmbeddedChunk]) -> List[Dict[str, Any]]:
+        # One contiguous block per batch, normalized in float32 then stored in the collection's
+        # vector dtype; rows hold views instead of lists of Python floats
+        vecs = np.empty((len(embedded_chunks), self.embedding_dim), dtype=np.float32)
+        for i, chunk in enumerate(embedded_chunks):
+            vecs[i] = chunk.embedding
+        vecs = _normalize_rows(vecs).astype(self._vector_dtype, copy=False)
+        
+        rows = [chunk.to_vector_db_format(include_vector=False) for chunk in embedded_chunks]
+        for row, vec in zip(rows, vecs):
+            row['vector'] = vec
+        return rows
+    
+    def insert_embeddings(
+        self,
+        embedded_chunks: List[EmbeddedChunk],
+        batch_size: Optional[int] = None,
+        bulk: bool = False,
+        bulk_staging_dir: Optional[str] = None
+    ) -> List[str]:
         if not embedded_chunks:
             return []
-        try:
-            data = []
-            for embedded_chunk in embedded_chunks:
-                chunk_data = embedded_chunk.to_vector_db_format()  
-                chunk_data['page_number'] = chunk_data['page_number'] or -1
-                chunk_data['start_char'] = chunk_data['start_char'] or -1
-                chunk_data['end_char'] = chunk_data['end_char'] or -1
-                
-                if isinstance(chunk_data['metadata'], dict):
-                    chunk_data['metadata'] = chunk_data['metadata']
-                
-                data.append(chunk_data)
-            
-            result = self.client.insert(
+        if bulk:
+            return self.bulk_insert_embeddings(embedded_chunks, bulk_staging_dir)
+        batch_size = batch_size or self.insert_batch_size
+        starts = range(0, len(embedded_chunks), batch_size)
+        
+        def insert_batch(start: int) -> List[str]:
+            data = self._encode_rows(embedded_chunks[start:start + batch_size])
+            self.client.insert(
                 collection_name=self.collection_name,
                 data=data
             )
+            return [item['id'] for item in data]
+        
+        try:
+            inserted_ids = []
+            # At most insert_workers batches are materialized at once, keeping peak memory
+            # O(insert_workers * batch_size) while encoding overlaps with the server-side write
+            workers = min(self.insert_workers, len(starts))
+            if workers == 1:
+                for start in starts:
+                    inserted_ids.extend(insert_batch(start))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for batch_ids in executor.map(insert_batch, starts):
+                        inserted_ids.extend(batch_ids)
             
-            inserted_ids = [item['id'] for item in data]
-            logger.info(f"Inserted {len(inserted_ids)} embeddings into database")
+            logger.info(f"Inserted {len(inserted_ids)} embeddings into database in batches of {batch_size}")
             
             return inserted_ids
             
@@ -204,18 +366,174 @@ class MilvusVectorDB:
             logger.error(f"Error inserting embeddings: {str(e)}")
             raise
     
+    @contextmanager
+    def begin_bulk(self):
+        """Group several insert_embeddings calls and flush the collection once at the end"""
+        with self._bulk_lock:
+            self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            with self._bulk_lock:
+                self._bulk_depth -= 1
+                outermost = self._bulk_depth == 0
+            if outermost:
+                self.end_bulk()
+    
+    def end_bulk(self):
+        try:
+            self.client.flush(collection_name=self.collection_name)
+            logger.info(f"Flushed collection {self.collection_name}")
+        except Exception as e:
+            logger.error(f"Error flushing collection: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _nprobe_for(nlist: int, profile: str = "balanced") -> int:
+        base = max(1, math.ceil(nlist * 0.01))
+        return min(nlist, base * _NPROBE_PROFILES[profile])
+    
+    def _load_index_info(self):
+        # Collections created by an earlier process: recover index type and nlist once
+        self._index_info_loaded = True
+        try:
+            index_info = self.client.describe_index(
+                collection_name=self.collection_name,
+                index_name="vector_index"
+            )
+        except Exception as e:
+            logger.debug(f"Could not describe vector index: {str(e)}")
+            return
+        if not index_info:
+            return
+        
+        self._index_type = index_info.get("index_type")
+        self._metric_type = index_info.get("metric_type")
+        if self.default_nprobe is None and index_info.get("nlist"):
+            self.default_nprobe = self._nprobe_for(int(index_info["nlist"]))
+        if self._metric_type == "L2":
+            # Indexes built before the switch to IP; scores are converted so higher still means closer
+            logger.warning(
+                f"Collection '{self.collection_name}' has an L2 index, reporting scores as cosine "
+                f"similarity; rebuild with create_index(force=True) to use IP"
+            )
+    
+    def _get_index_type(self) -> Optional[str]:
+        if self._index_type is None and not self._index_info_loaded:
+            self._load_index_info()
+        return self._index_type
+    
+    def _get_metric_type(self) -> Optional[str]:
+        if self._metric_type is None and not self._index_info_loaded:
+            self._load_index_info()
+        return self._metric_type
+    
+    def _is_milvus_lite(self) -> bool:
+        return not self.db_path.startswith(("http://", "https://", "tcp://", "unix:"))
+    
+    def bulk_insert_embeddings(
+        self,
+        embedded_chunks: List[EmbeddedChunk],
+        staging_dir: Optional[str] = None,
+        timeout: float = 600.0
+    ) -> List[str]:
+        """Load an initial corpus through Milvus bulk import, bypassing the WAL.
+        
+        staging_dir must be the local view of the bucket the Milvus server
+        imports from. Milvus Lite has no bulk import, so there this falls back
+        to batched inserts.
+        """
+        if not embedded_chunks:
+            return []
+        if self._is_milvus_lite() or not staging_dir:
+            logger.warning("Bulk import needs a Milvus server and a staging dir, falling back to batched insert")
+            return self.insert_embeddings(embedded_chunks)
+        
+        try:
+            file_name = f"{self.collection_name}-{uuid.uuid4().hex}.json"
+            staging_path = Path(staging_dir) / file_name
+            staging_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # Row-based JSON import file, written row by row to avoid one giant list in memory
+            inserted_ids = []
+            with open(staging_path, "w", encoding="utf-8") as f:
+                f.write("[")
+                for start in range(0, len(embedded_chunks), self.insert_batch_size):
+                    for row in self._encode_rows(embedded_chunks[start:start + self.insert_batch_size]):
+                        if inserted_ids:
+                            f.write(",")
+                        row['vector'] = row['vector'].tolist()
+                        json.dump(row, f, separators=(",", ":"))
+                        inserted_ids.append(row['id'])
+                f.write("]")
+            
+            connections.connect(alias="bulk_insert", uri=self.db_path)
+            try:
+                task_id = utility.do_bulk_insert(
+                    collection_name=self.collection_name,
+                    files=[file_name],
+                    using="bulk_insert"
+                )
+                logger.info(f"Bulk import task {task_id} started for {len(inserted_ids)} embeddings")
+                
+                deadline = time.monotonic() + timeout
+                while True:
+                    state = utility.get_bulk_insert_state(task_id=task_id, using="bulk_insert")
+                    if state.state == state.ImportCompleted:
+                        break
+                    if state.state == state.ImportFailed:
+                        raise Exception(f"Bulk import failed: {state.failed_reason}")
+                    if time.monotonic() > deadline:
+                        raise Exception(f"Bulk import task {task_id} timed out after {timeout}s")
+                    time.sleep(1.0)
+            finally:
+                connections.disconnect("bulk_insert")
+            
+            logger.info(f"Bulk imported {len(inserted_ids)} embeddings into database")
+            return inserted_ids
+            
+        except Exception as e:
+            logger.error(f"Error bulk inserting embeddings: {str(e)}")
+            raise
+    
     def search(
         self,
-        query_vector: List[float],
+        query_vector: Union[List[float], np.ndarray],
         limit: int = 10,
-        nprobe: int = 128,
-        rbq_query_bits: int = 0,
-        refine_k: float = 1.0,
+        nprobe: Optional[int] = None,
+        rbq_query_bits: int = 4,
+        refine_k: float = 3.0,
         filter_expr: Optional[str] = None,
-        use_binary_quantization: bool = False
+        filter_params: Optional[Dict[str, Any]] = None,
+        use_binary_quantization: Optional[bool] = None,
+        raw: bool = False,
+        include_metadata: bool = False
     ) -> List[Dict[str, Any]]:
         try:
+            # pymilvus takes ndarrays directly; the query must match the vector field's dtype
+            query_vector = _normalize_rows(np.array(query_vector, dtype=np.float32)).astype(self._vector_dtype, copy=False)
+            
+            # Callers treat score as a similarity, so distances from other metrics are converted
+            metric_type = self._get_metric_type()
+            if metric_type == "L2":
+                to_score = _l2_to_similarity
+            elif metric_type is None or metric_type in _SIMILARITY_METRICS:
+                to_score = float
+            else:
+                raise ValueError(
+                    f"Collection '{self.collection_name}' is indexed with unsupported metric {metric_type}; "
+                    f"rebuild the index with create_index(force=True)"
+                )
+            
+            if use_binary_quantization is None:
+                use_binary_quantization = self._get_index_type() == "IVF_RABITQ"
+            if nprobe is None:
+                if self.default_nprobe is None and not self._index_info_loaded:
+                    self._load_index_info()
+                nprobe = self.default_nprobe or 16
+            
             if use_binary_quantization:
+                # Milvus fetches limit * refine_k quantized candidates and rescores them with the SQ8 refiner
                 search_params = {
                     "params": {
                         "nprobe": nprobe,
@@ -238,31 +556,49 @@ class MilvusVectorDB:
                 limit=limit,
                 search_params=search_params,
                 filter=filter_expr,
-                output_fields=[
-                    "content", "source_file", "source_type", "page_number",
-                    "chunk_index", "start_char", "end_char", "metadata", "embedding_model"
-                ]
+                filter_params=filter_params or {},
+                # The JSON metadata blob is only fetched and decoded when asked for
+                output_fields=_SEARCH_OUTPUT_FIELDS + (["url", "metadata"] if include_metadata else ["url"])
             )
             
+            hits = results[0] if results else []
+            if raw:
+                # Skip formatting for callers that only need ids and distances
+                return list(hits)
+            
             formatted_results = []
-            if results and len(results) > 0:
-                for result in results[0]:
-                    formatted_result = {
-                        'id': result['id'],
-                        'score': result['distance'],
-                        'content': result['entity']['content'],
-                        'citation': {
-                            'source_file': result['entity']['source_file'],
-                            'source_type': result['entity']['source_type'],
-                            'page_number': result['entity']['page_number'] if result['entity']['page_number'] != -1 else None,
-                            'chunk_index': result['entity']['chunk_index'],
-                            'start_char': result['entity']['start_char'] if result['entity']['start_char'] != -1 else None,
-                            'end_char': result['entity']['end_char'] if result['entity']['end_char'] != -1 else None,
-                        },
-                        'metadata': result['entity']['metadata'],
-                        'embedding_model': result['entity']['embedding_model']
-                    }
-                    formatted_results.append(formatted_result)
+            for result in hits:
+                entity = result['entity']
+                (content, source_file, source_type, page_number, chunk_index,
+                 start_char, end_char, embedding_model) = _get_entity_fields(entity)
+                metadata = entity.get('metadata') or {}
+                if include_metadata:
+                    # Only complete rows may serve later get_chunk_by_id calls
+                    self._cache_chunk(result['id'], {
+                        "id": result['id'],
+                        "content": content,
+                        "metadata": metadata,
+                        "source_file": source_file,
+                        "source_type": source_type,
+                        "page_number": page_number,
+                        "chunk_index": chunk_index
+                    })
+                formatted_results.append({
+                    'id': result['id'],
+                    'score': to_score(result['distance']),
+                    'content': content,
+                    'citation': {
+                        'source_file': source_file,
+                        'source_type': source_type,
+                        'page_number': page_number if page_number != -1 else None,
+                        'chunk_index': chunk_index,
+                        'start_char': start_char if start_char != -1 else None,
+                        'end_char': end_char if end_char != -1 else None,
+                        'url': entity.get('url') or None,
+                    },
+                    'metadata': metadata,
+                    'embedding_model': embedding_model
+                })
             
             logger.info(f"Search completed: {len(formatted_results)} results found")
             return formatted_results
@@ -275,6 +611,8 @@ class MilvusVectorDB:
         try:
             if self.client.has_collection(collection_name=self.collection_name):
                 self.client.drop_collection(collection_name=self.collection_name)
+                with self._chunk_cache_lock:
+                    self._chunk_cache.clear()
                 logger.info(f"Collection '{self.collection_name}' deleted")
                 self.collection_exists = False
             else:
@@ -284,26 +622,41 @@ class MilvusVectorDB:
             logger.error(f"Error deleting collection: {str(e)}")
             raise
     
-    def get_chunk_by_id(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+    def _cache_chunk(self, chunk_id: str, chunk: Dict[str, Any]):
+        with self._chunk_cache_lock:
+            self._chunk_cache[chunk_id] = chunk
+            self._chunk_cache.move_to_end(chunk_id)
+            if len(self._chunk_cache) > self.chunk_cache_size:
+                self._chunk_cache.popitem(last=False)
+    
+    def get_chunks_by_ids(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve many chunk ids with at most one Milvus query, serving repeats from the LRU cache"""
+        if not self.collection_exists:
+            logger.warning("Collection does not exist")
+            return {}
+        
+        found = {}
+        with self._chunk_cache_lock:
+            for chunk_id in chunk_ids:
+                cached = self._chunk_cache.get(chunk_id)
+                if cached is not None:
+                    self._chunk_cache.move_to_end(chunk_id)
+                    found[chunk_id] = cached
+        
+        missing = list(dict.fromkeys(cid for cid in chunk_ids if cid not in found))
+        if not missing:
+            return found
+        
         try:
-            if not self.collection_exists:
-                logger.warning("Collection does not exist")
-                return None
-            
-            logger.info(f"Attempting to retrieve chunk with ID: {chunk_id}")
-            
             results = self.client.query(
                 collection_name=self.collection_name,
-                filter=f'id == "{chunk_id}"',
+                filter=_IDS_FILTER,
+                filter_params={"ids": missing},
                 output_fields=["id", "content", "metadata", "source_file", "source_type", "page_number", "chunk_index"]
             )
+            logger.info(f"Query for {len(missing)} chunk ids returned {len(results) if results else 0} results")
             
-            logger.info(f"Query returned {len(results) if results else 0} results")
-            
-            if results and len(results) > 0:
-                chunk_data = results[0]
-                logger.info(f"Successfully retrieved chunk: {chunk_data.get('id')}")
-                
+            for chunk_data in results or []:
                 metadata = chunk_data.get("metadata", {})
                 if isinstance(metadata, str):
                     try:
@@ -311,7 +664,7 @@ class MilvusVectorDB:
                     except:
                         metadata = {}
                 
-                return {
+                chunk = {
                     "id": chunk_data.get("id"),
                     "content": chunk_data.get("content"),
                     "metadata": metadata,
@@ -320,14 +673,19 @@ class MilvusVectorDB:
                     "page_number": chunk_data.get("page_number"),
                     "chunk_index": chunk_data.get("chunk_index")
                 }
-            
-            logger.warning(f"No chunk found with ID: {chunk_id}")
-            return None
+                found[chunk["id"]] = chunk
+                self._cache_chunk(chunk["id"], chunk)
             
         except Exception as e:
-            logger.error(f"Error retrieving chunk by ID {chunk_id}: {str(e)}")
-            logger.error(f"Exception details: {type(e).__name__}: {str(e)}")
-            return None
+            logger.error(f"Error retrieving chunks by ID: {type(e).__name__}: {str(e)}")
+        
+        return found
+    
+    def get_chunk_by_id(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        chunk = self.get_chunks_by_ids([chunk_id]).get(chunk_id)
+        if chunk is None:
+            logger.warning(f"No chunk found with ID: {chunk_id}")
+        return chunk
     
     def close(self):
         try:
@@ -357,7 +715,7 @@ if __name__ == "__main__":
         query_text = "What is the main topic?"
         query_vector = embedding_generator.generate_query_embedding(query_text)
         
-        search_results = vector_db.search(query_vector.tolist(), limit=5)
+        search_results = vector_db.search(query_vector, limit=5)
         
         for i, result in enumerate(search_results):
             print(f"\nResult {i+1}:")
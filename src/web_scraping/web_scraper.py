@@ -1,6 +1,15 @@
+import bisect
+import hashlib
+import json
 import logging
 import os
-from typing import List, Dict, Any, Optional
+import re
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from types import SimpleNamespace
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
@@ -13,6 +22,52 @@ from src.document_processing.doc_processor import DocumentChunk
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Lookahead so overlapping runs like '\n\n\n' yield every position, matching str.rfind
+_PARAGRAPH_BREAK_RE = re.compile(r'(?=\n\n)')
+_PERIOD_RE = re.compile(r'\.')
+_VALID_URL_RE = re.compile(r'^https?://[^/\s]+', re.IGNORECASE)
+_WORD_RE = re.compile(r'\S+')
+
+
+def _count_words(content: Optional[str]) -> int:
+    # Counts matches one at a time instead of materializing content.split()
+    return sum(1 for _ in _WORD_RE.finditer(content)) if content else 0
+
+
+def _last_boundary_before(positions: List[int], start: int, limit: int) -> int:
+    """Largest position in [start, limit], or -1, via binary search"""
+    idx = bisect.bisect_right(positions, limit) - 1
+    if idx >= 0 and positions[idx] >= start:
+        return positions[idx]
+    return -1
+
+
+def _snap_chunk_spans(content: str, chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+    """Compute every (start, end) chunk span up front, snapped to paragraph or sentence ends"""
+    content_length = len(content)
+    # One regex pass over the page instead of two rfind scans per chunk
+    paragraph_breaks = [m.start() for m in _PARAGRAPH_BREAK_RE.finditer(content)]
+    periods = [m.start() for m in _PERIOD_RE.finditer(content)]
+    paragraph_min = chunk_size * 0.3
+    period_min = chunk_size * 0.5
+    step = chunk_size - chunk_overlap
+    
+    spans = []
+    start = 0
+    while start < content_length:
+        end = min(start + chunk_size, content_length)
+        if end < content_length:
+            last_double_newline = _last_boundary_before(paragraph_breaks, start, end - 2)
+            if last_double_newline > start + paragraph_min:
+                end = last_double_newline + 2
+            else:
+                last_period = _last_boundary_before(periods, start, end - 1)
+                if last_period > start + period_min:
+                    end = last_period + 1
+        spans.append((start, end))
+        start = max(start + step, end)
+    return spans
+
 
 @dataclass
 class WebPageData:
@@ -26,10 +81,25 @@ class WebPageData:
 
 
 class WebScraper:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        cache_dir: Optional[Path] = Path(".firecrawl_cache"),
+        cache_ttl_hours: float = 24.0
+    ):
         self.api_key = api_key
         self.app = Firecrawl(api_key=api_key)
         
+        # Scrape results are cached on disk by URL and content-affecting params; None disables it
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_ttl_hours = cache_ttl_hours
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Per-domain politeness: requests to one host are spaced out, different hosts run in parallel
+        self._domain_locks = defaultdict(threading.Lock)
+        self._domain_last_request: Dict[str, float] = {}
+        
         logger.info("WebScraper initialized with Firecrawl")
     
     def scrape_url(
@@ -51,7 +121,7 @@ class WebScraper:
                 'timeout': wait_for_results * 1000
             }
             
-            result = self.app.scrape(url, **scrape_params)
+            result = self._cached_scrape(url, scrape_params)
             page_data = self._process_firecrawl_result(result, url)
             
             chunks = self._create_chunks_from_web_content(
@@ -67,7 +137,40 @@ class WebScraper:
             logger.error(f"Error scraping URL {url}: {str(e)}")
             raise
     
+    def _cached_scrape(self, url: str, scrape_params: Dict[str, Any]) -> Any:
+        if not self.cache_dir:
+            return self.app.scrape(url, **scrape_params)
+        
+        # The timeout does not change what is scraped, so it stays out of the key
+        key_params = sorted((k, v) for k, v in scrape_params.items() if k != 'timeout')
+        key = hashlib.sha256(f"{url}|{key_params}".encode()).hexdigest()
+        cache_path = self.cache_dir / f"{key}.json"
+        
+        if cache_path.exists():
+            age_hours = (time.time() - cache_path.stat().st_mtime) / 3600
+            if age_hours < self.cache_ttl_hours:
+                try:
+                    with open(cache_path, 'r', encoding='utf-8') as f:
+                        cached = json.load(f)
+                    logger.info(f"Loaded cached scrape for {url}")
+                    return SimpleNamespace(**cached)
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable scrape cache {cache_path}: {e}")
+        
+        result = self.app.scrape(url, **scrape_params)
+        try:
+            # Per-thread temp name, batch scrapes may write the same key concurrently
+            tmp_path = cache_path.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'markdown': result.markdown, 'metadata_dict': result.metadata_dict}, f)
+            tmp_path.replace(cache_path)
+        except Exception as e:
+            logger.warning(f"Could not cache scrape result: {e}")
+        
+        return result
+    
     def _process_firecrawl_result(self, result: Dict[str, Any], url: str) -> WebPageData:
+        domain = urlparse(url).netloc
         try:
             content = result.markdown
             metadata_dict = result.metadata_dict
@@ -78,9 +181,9 @@ class WebScraper:
                 'description': metadata_dict.get('description', ''),
                 'keywords': metadata_dict.get('keywords', []),
                 'language': metadata_dict.get('language', 'en'),
-                'word_count': len(content.split()) if content else 0,
+                'word_count': _count_words(content),
                 'character_count': len(content) if content else 0,
-                'domain': urlparse(url).netloc
+                'domain': domain
             }
             
             return WebPageData(
@@ -95,7 +198,7 @@ class WebScraper:
             logger.error(f"Error processing Firecrawl result: {str(e)}")
             return WebPageData(
                 url=url,
-                title=f"Error - {urlparse(url).netloc}",
+                title=f"Error - {domain}",
                 content="",
                 metadata={'error': str(e), 'scraped_at': datetime.now().isoformat()},
                 success=False,
@@ -115,29 +218,19 @@ class WebScraper:
         
         chunks = []
         content = page_data.content
-        start = 0
+        base_metadata = page_data.metadata
         chunk_index = 0
         
-        while start < len(content):
-            end = min(start + chunk_size, len(content))
-            if end < len(content):
-                last_double_newline = content.rfind('\n\n', start, end)
-                if last_double_newline > start + chunk_size * 0.3:
-                    end = last_double_newline + 2
-                else:
-                    last_period = content.rfind('.', start, end)
-                    if last_period > start + chunk_size * 0.5:
-                        end = last_period + 1
-            
+        for start, end in _snap_chunk_spans(content, chunk_size, chunk_overlap):
             chunk_text = content[start:end].strip()
             
             if chunk_text:
-                chunk_metadata = page_data.metadata.copy()
-                chunk_metadata.update({
+                chunk_metadata = {
+                    **base_metadata,
                     'chunk_character_start': start,
                     'chunk_character_end': end - 1,
                     'url_fragment': f"{page_data.url}#chunk-{chunk_index}"
-                })
+                }
                 
                 chunk = DocumentChunk(
                     content=chunk_text,
@@ -152,41 +245,79 @@ class WebScraper:
                 
                 chunks.append(chunk)
                 chunk_index += 1
-            
-            start = max(start + chunk_size - chunk_overlap, end)
         
+        # Chunks hold their own slices, drop the page-sized string before returning
+        page_data.content = ''
         return chunks
     
-    def batch_scrape_urls(
+    def iter_scrape_urls(
         self,
         urls: List[str],
         chunk_size: int = 1000,
         chunk_overlap: int = 100,
-        delay_between_requests: float = 1.0
-    ) -> List[List[DocumentChunk]]:
+        delay_between_requests: float = 1.0,
+        max_workers: int = 8
+    ) -> Iterator[List[DocumentChunk]]:
+        """Yield each URL's chunks in input order as soon as they are ready"""
         
-        all_chunks = []
-        for i, url in enumerate(urls):
+        def scrape_one(url: str) -> List[DocumentChunk]:
             try:
+                self._wait_for_domain_slot(urlparse(url).netloc, delay_between_requests)
                 chunks = self.scrape_url(url, chunk_size, chunk_overlap)
-                all_chunks.append(chunks)
                 logger.info(f"Successfully scraped {url}: {len(chunks)} chunks")
+                return chunks
                 
-                if i < len(urls) - 1:
-                    time.sleep(delay_between_requests)
-                    
             except Exception as e:
                 logger.error(f"Failed to scrape {url}: {str(e)}")
-                all_chunks.append([])
+                return []
+        
+        if not urls:
+            return
+        
+        # Only max_workers pages are in flight or waiting to be consumed at any time
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            pending = deque()
+            url_iter = iter(urls)
+            for url in islice(url_iter, max_workers):
+                pending.append(executor.submit(scrape_one, url))
+            
+            while pending:
+                chunks = pending.popleft().result()
+                next_url = next(url_iter, None)
+                if next_url is not None:
+                    pending.append(executor.submit(scrape_one, next_url))
+                yield chunks
+    
+    def batch_scrape_urls(
+        self,
+        urls: List[str],
+        chunk_size: int = 1000,
+        chunk_overlap: int = 100,
+        delay_between_requests: float = 1.0,
+        max_workers: int = 8
+    ) -> List[List[DocumentChunk]]:
+        
+        all_chunks = list(self.iter_scrape_urls(
+            urls, chunk_size, chunk_overlap, delay_between_requests, max_workers
+        ))
         
         total_chunks = sum(len(chunks) for chunks in all_chunks)
         logger.info(f"Batch scraping complete: {total_chunks} total chunks from {len(urls)} URLs")
         
         return all_chunks
     
+    def _wait_for_domain_slot(self, domain: str, delay: float):
+        with self._domain_locks[domain]:
+            last_request = self._domain_last_request.get(domain)
+            if last_request is not None:
+                remaining = delay - (time.monotonic() - last_request)
+                if remaining > 0:
+                    time.sleep(remaining)
+            self._domain_last_request[domain] = time.monotonic()
+    
     def get_url_preview(self, url: str) -> Dict[str, Any]:
         try:
-            result = self.app.scrape(url, **{
+            result = self._cached_scrape(url, {
                 'formats': ['markdown'],
                 'timeout': 10000
             })
@@ -198,7 +329,7 @@ class WebScraper:
                 'url': url,
                 'title': metadata_dict.get('title', ''),
                 'description': metadata_dict.get('description', ''),
-                'word_count': len(content.split()) if content else 0,
+                'word_count': _count_words(content),
                 'character_count': len(content) if content else 0,
                 'domain': urlparse(url).netloc,
                 'content_preview': content[:500] + '...' if len(content) > 500 else content,
@@ -211,11 +342,7 @@ class WebScraper:
             return {'error': str(e)}
     
     def _is_valid_url(self, url: str) -> bool:
-        try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except:
-            return False
+        return bool(_VALID_URL_RE.match(url))
 
 
 if __name__ == "__main__":
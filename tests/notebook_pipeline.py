@@ -1,11 +1,24 @@
 import os
+import asyncio
 import logging
+import threading
+import time
+from collections import deque
+from dataclasses import replace
+from functools import cached_property
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Iterator
 
 from src.document_processing.doc_processor import DocumentProcessor
 from src.embeddings.embedding_generator import EmbeddingGenerator
+from src.embeddings.reranker import Reranker
 from src.vector_database.milvus_vector_db import MilvusVectorDB
 from src.generation.rag import RAGGenerator
+from src.generation.query_routing import is_literal, needs_retrieval
+from src.generation.semantic_cache import SemanticCache
+from src.generation.rate_limiter import RateLimiter
 from src.memory.memory_layer import NotebookMemoryLayer
 from src.audio_processing.audio_transcriber import AudioTranscriber
 from src.web_scraping.web_scraper import WebScraper
@@ -15,7 +28,13 @@ logger = logging.getLogger(__name__)
 
 
 class NotebookLMPipeline:
-    def __init__(self):
+    def __init__(
+        self,
+        insert_batch_size: int = 1000,
+        embedding_token_budget: int = 8192,
+        max_inflight_inserts: int = 3,
+        binary_quantization_threshold: int = 10_000
+    ):
         self.openai_key = os.getenv("OPENAI_API_KEY")
         self.assemblyai_key = os.getenv("ASSEMBLYAI_API_KEY")
         self.firecrawl_key = os.getenv("FIRECRAWL_API_KEY")
@@ -27,55 +46,103 @@ class NotebookLMPipeline:
         logger.info("Initializing NotebookLM Pipeline...")
         
         self.doc_processor = DocumentProcessor()
-        self.embedding_generator = EmbeddingGenerator()
-        self.vector_db = MilvusVectorDB()
+        self.embedding_generator = EmbeddingGenerator(
+            cache_path=os.getenv("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite"),
+            backend=os.getenv("EMBEDDING_BACKEND", "onnx-cpu")
+        )
+        self.vector_db = MilvusVectorDB(insert_batch_size=insert_batch_size)
+        self.binary_quantization_threshold = binary_quantization_threshold
+        
+        # Chunks from every source share one buffer, embedded in token-budgeted batches
+        self.embedding_token_budget = embedding_token_budget
+        self._pending_chunks = []
+        self._pending_tokens = 0
+        
+        # Inserts run on one background thread so the next batch embeds while the last one is written
+        self.max_inflight_inserts = max_inflight_inserts
+        self._insert_executor = ThreadPoolExecutor(max_workers=1)
+        self._inflight_inserts = deque()
+        self._inflight_slots = threading.BoundedSemaphore(max_inflight_inserts)
+        # The async entry points run ingestion sources on worker threads that share this buffer;
+        # the lock only covers buffer and bookkeeping swaps, never embedding or waiting on inserts
+        self._ingest_lock = threading.Lock()
+        self.reranker = Reranker() if os.getenv("RERANKER_ENABLED") else None
+        self._openai_limiter = RateLimiter(max_rate=float(os.getenv("OPENAI_RPM", "3500")), time_period=60)
         self.rag_generator = RAGGenerator(
             embedding_generator=self.embedding_generator,
             vector_db=self.vector_db,
             openai_api_key=self.openai_key,
             model_name="gpt-4o-mini",
-            temperature=0.1
+            temperature=0.1,
+            reranker=self.reranker,
+            rate_limiter=self._openai_limiter
         )
         
-        self.audio_transcriber = AudioTranscriber(self.assemblyai_key) if self.assemblyai_key else None
-        self.web_scraper = WebScraper(self.firecrawl_key) if self.firecrawl_key else None
-        
-        self.memory = None
-        if self.zep_key:
-            self.memory = NotebookMemoryLayer(
-                user_id="test_user",
-                session_id="test_session",
-                create_new_session=True
-            )
+        # Near-duplicate questions are answered from cache, cleared whenever new content is indexed
+        self._semantic_cache = SemanticCache(dim=self.embedding_generator.get_embedding_dimension())
         
         logger.info("Pipeline initialized successfully!")
     
+    # Optional backends open sessions or load models, so they are only built on first use
+    @cached_property
+    def audio_transcriber(self):
+        return AudioTranscriber(self.assemblyai_key) if self.assemblyai_key else None
+    
+    @cached_property
+    def web_scraper(self):
+        return WebScraper(self.firecrawl_key) if self.firecrawl_key else None
+    
+    @cached_property
+    def memory(self):
+        if not self.zep_key:
+            return None
+        return NotebookMemoryLayer(
+            user_id="test_user",
+            session_id="test_session",
+            create_new_session=True
+        )
+    
     def process_documents(self, file_paths):
         logger.info(f"Processing {len(file_paths)} documents...")
+        t0 = time.perf_counter()
+        
+        # Parsers run concurrently; each result lands in its input slot, failures stay empty
+        chunks_per_file = [()] * len(file_paths)
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(file_paths)))) as executor:
+            futures = {
+                executor.submit(self.doc_processor.process_document, file_path): (i, file_path)
+                for i, file_path in enumerate(file_paths)
+            }
+            for future in as_completed(futures):
+                i, file_path = futures[future]
+                try:
+                    chunks = future.result()
+                    chunks_per_file[i] = chunks
+                    logger.debug("✓ Processed %s: %d chunks", file_path, len(chunks))
+                except Exception as e:
+                    logger.error(f"✗ Failed to process {file_path}: {e}")
         
-        all_chunks = []
-        for file_path in file_paths:
-            try:
-                chunks = self.doc_processor.process_document(file_path)
-                all_chunks.extend(chunks)
-                logger.info(f"✓ Processed {file_path}: {len(chunks)} chunks")
-            except Exception as e:
-                logger.error(f"✗ Failed to process {file_path}: {e}")
+        # Sized once from the per-file lists instead of growing through repeated extends
+        all_chunks = list(chain.from_iterable(chunks_per_file))
         
         if not all_chunks:
             logger.error("No documents processed successfully!")
             return False
         
-        logger.info("Generating embeddings...")
-        embedded_chunks = self.embedding_generator.generate_embeddings(all_chunks)
-        
         logger.info("Setting up vector database...")
-        self.vector_db.create_index(use_binary_quantization=False)
+        # Large corpora get 1-bit RaBitQ codes with SQ8 rescoring, small ones stay exact
+        quantization = "rabitq" if len(all_chunks) > self.binary_quantization_threshold else "none"
+        self.vector_db.create_index(quantization=quantization, n_vectors=len(all_chunks))
         
-        logger.info("Inserting embeddings...")
-        self.vector_db.insert_embeddings(embedded_chunks)
+        logger.info("Generating and inserting embeddings...")
+        with self.vector_db.begin_bulk():
+            self._enqueue(all_chunks)
+            self.flush()
         
-        logger.info(f"✓ Successfully processed {len(all_chunks)} chunks from {len(file_paths)} documents")
+        logger.info(
+            "✓ Processed %d files / %d chunks (%.2fs)",
+            len(file_paths), len(all_chunks), time.perf_counter() - t0
+        )
         return True
     
     def process_audio(self, audio_path):
@@ -88,8 +155,9 @@ class NotebookLMPipeline:
             chunks = self.audio_transcriber.transcribe_audio(audio_path)
             
             if chunks:
-                embedded_chunks = self.embedding_generator.generate_embeddings(chunks)
-                self.vector_db.insert_embeddings(embedded_chunks)
+                with self.vector_db.begin_bulk():
+                    self._enqueue(chunks)
+                    self.flush()
                 logger.info(f"✓ Audio processed: {len(chunks)} chunks")
                 return True
             
@@ -108,8 +176,9 @@ class NotebookLMPipeline:
             chunks = self.web_scraper.scrape_url(url)
             
             if chunks:
-                embedded_chunks = self.embedding_generator.generate_embeddings(chunks)
-                self.vector_db.insert_embeddings(embedded_chunks)
+                with self.vector_db.begin_bulk():
+                    self._enqueue(chunks)
+                    self.flush()
                 logger.info(f"✓ URL processed: {len(chunks)} chunks")
                 return True
             
@@ -118,11 +187,96 @@ class NotebookLMPipeline:
         
         return False
     
+    def _enqueue(self, chunks):
+        for chunk in chunks:
+            with self._ingest_lock:
+                self._pending_chunks.append(chunk)
+                # ~4 characters per token is close enough for budgeting
+                self._pending_tokens += len(chunk.content) // 4 + 1
+                batch = self._take_pending() if self._pending_tokens >= self.embedding_token_budget else None
+            if batch:
+                self._embed_and_submit(batch)
+    
+    def _take_pending(self):
+        # Caller holds _ingest_lock
+        batch = self._pending_chunks
+        self._pending_chunks, self._pending_tokens = [], 0
+        return batch
+    
+    def _embed_and_submit(self, batch):
+        embedded_chunks = self.embedding_generator.generate_embeddings(batch)
+        
+        # Backpressure: at most max_inflight_inserts batches wait on the insert worker
+        self._inflight_slots.acquire()
+        future = self._insert_executor.submit(self.vector_db.insert_embeddings, embedded_chunks)
+        future.add_done_callback(lambda _: self._inflight_slots.release())
+        with self._ingest_lock:
+            self._inflight_inserts.append(future)
+    
+    def flush(self):
+        """Embed whatever is buffered and wait until every batch is in the vector DB"""
+        with self._ingest_lock:
+            batch = self._take_pending()
+        if batch:
+            self._embed_and_submit(batch)
+        
+        with self._ingest_lock:
+            pending = list(self._inflight_inserts)
+        try:
+            for future in pending:
+                future.result()
+        finally:
+            # Other sources' flushes may wait on the same futures; whichever removes one counts it
+            inserted = 0
+            with self._ingest_lock:
+                for future in pending:
+                    if future.done() and future in self._inflight_inserts:
+                        self._inflight_inserts.remove(future)
+                        if not future.exception():
+                            inserted += len(future.result())
+        if inserted:
+            self._semantic_cache.clear()
+        return inserted
+    
+    # Async entry points: the blocking SDK calls (parsing, AssemblyAI, Firecrawl, OpenAI, Milvus)
+    # run on worker threads so independent sources and questions overlap on one event loop
+    async def aprocess_documents(self, file_paths):
+        return await asyncio.to_thread(self.process_documents, file_paths)
+    
+    async def aprocess_audio(self, audio_path):
+        return await asyncio.to_thread(self.process_audio, audio_path)
+    
+    async def aprocess_url(self, url):
+        return await asyncio.to_thread(self.process_url, url)
+    
+    async def aask_question(self, question):
+        return await asyncio.to_thread(self.ask_question, question)
+    
+    def _answer(self, question):
+        if not needs_retrieval(question):
+            # Chitchat skips embedding, Milvus and reranking entirely
+            return self.rag_generator.chat_only(question)
+        
+        query_vector = self.embedding_generator.generate_query_embedding(question)
+        cached = self._semantic_cache.get(query_vector)
+        if cached is not None:
+            return replace(cached, query=question)
+        
+        result = self.rag_generator.generate_response(
+            question,
+            query_vector=query_vector,
+            rerank=not is_literal(question)
+        )
+        if result.retrieval_count:
+            self._semantic_cache.put(query_vector, result)
+        return result
+    
     def ask_question(self, question):
         logger.info(f"Processing question: {question}")
         
         try:
-            result = self.rag_generator.generate_response(question)
+            result = self._answer(question)
+            
             if self.memory:
                 self.memory.save_conversation_turn(result)
             
@@ -132,8 +286,76 @@ class NotebookLMPipeline:
             logger.error(f"✗ Question processing failed: {e}")
             return None
     
+    def ask_questions(self, questions, max_workers: int = 4):
+        """Answer several questions with retrieval and LLM requests in flight together"""
+        logger.info(f"Processing {len(questions)} questions...")
+        
+        results = [None] * len(questions)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions)))) as executor:
+            futures = {executor.submit(self._answer, question): i for i, question in enumerate(questions)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    logger.error(f"✗ Question processing failed: {e}")
+        
+        # Turns are saved in question order, not completion order
+        if self.memory:
+            for result in results:
+                if result:
+                    self.memory.save_conversation_turn(result)
+        
+        return results
+    
+    def ask_question_stream(self, question) -> Iterator[str]:
+        logger.info(f"Streaming question: {question}")
+        
+        if not needs_retrieval(question):
+            result = self.rag_generator.chat_only(question)
+            if self.memory:
+                self.memory.save_conversation_turn(result)
+            yield result.response
+            return
+        
+        query_vector = self.embedding_generator.generate_query_embedding(question)
+        cached = self._semantic_cache.get(query_vector)
+        if cached is not None:
+            result = replace(cached, query=question)
+            if self.memory:
+                self.memory.save_conversation_turn(result)
+            yield result.response
+            return
+        
+        result, tokens = self.rag_generator.generate_response_stream(
+            question,
+            query_vector=query_vector,
+            rerank=not is_literal(question)
+        )
+        parts = []
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield token
+        except Exception as e:
+            logger.error(f"✗ Streaming failed: {e}")
+            raise
+        
+        # Only a fully streamed answer is cached or remembered; a failure or a consumer
+        # that stops early leaves a fragment that must not pass for a real turn
+        result = replace(result, response="".join(parts))
+        if result.retrieval_count:
+            self._semantic_cache.put(query_vector, result)
+        if self.memory and result.response:
+            self.memory.save_conversation_turn(result)
+    
     def cleanup(self):
         try:
+            self.flush()
+            self._insert_executor.shutdown()
+            # Only close memory if it was ever built; touching the property would create it
+            if self.__dict__.get('memory'):
+                self.memory.close()
             self.vector_db.close()
             logger.info("Pipeline cleaned up")
         except Exception as e:
@@ -148,16 +370,31 @@ def test_pipeline():
     try:
         pipeline = NotebookLMPipeline()
         
-        # Test 1: Document Processing
-        logger.info("\n TEST 1: Document Processing")
+        # Tests 1-3: documents, audio and URLs are ingested concurrently
+        logger.info("\n TEST 1-3: Document, Audio and Web Ingestion")
         test_documents = [
             # Add paths to your test files here
             # "sample.pdf",
             # "document.txt"
         ]
+        test_audio = [
+            # "sample_audio.mp3"
+        ]
+        test_urls = [
+            # "https://example.com"
+        ]
+        
+        async def ingest_all():
+            tasks = [pipeline.aprocess_audio(path) for path in test_audio]
+            tasks += [pipeline.aprocess_url(url) for url in test_urls]
+            if test_documents:
+                tasks.insert(0, pipeline.aprocess_documents(test_documents))
+            return await asyncio.gather(*tasks)
+        
+        results = asyncio.run(ingest_all())
         
         if test_documents:
-            success = pipeline.process_documents(test_documents)
+            success = results[0]
             if not success:
                 logger.warning("Document processing failed - creating sample data")
                 # Create a simple test document
@@ -167,16 +404,10 @@ def test_pipeline():
                 test_file.unlink()
         else:
             logger.info("No test documents provided - skipping document test")
-        
-        # Test 2: Audio Processing
-        logger.info("\n🎵 TEST 2: Audio Processing")
-        # pipeline.process_audio("sample_audio.mp3")
-        logger.info("Audio test skipped (no sample file)")
-        
-        # Test 3: Web Scraping
-        logger.info("\n TEST 3: Web Scraping")
-        # pipeline.process_url("https://example.com")
-        logger.info("Web scraping test skipped")
+        if not test_audio:
+            logger.info("Audio test skipped (no sample file)")
+        if not test_urls:
+            logger.info("Web scraping test skipped")
         
         # Test 4: Question Answering
         logger.info("\n TEST 4: Question Answering")
@@ -187,9 +418,8 @@ def test_pipeline():
             "What information is available about artificial intelligence?"
         ]
         
-        for question in test_questions:
+        for question, result in zip(test_questions, pipeline.ask_questions(test_questions)):
             logger.info(f"\nQ: {question}")
-            result = pipeline.ask_question(question)
             
             if result:
                 logger.info(f"A: {result.response}")
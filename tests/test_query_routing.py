@@ -0,0 +1,48 @@
+import pytest
+
+from src.generation.query_routing import is_literal, needs_retrieval
+
+
+@pytest.mark.parametrize("question", [
+    '"gradient clipping"',
+    'Where does the paper mention "gradient clipping"?',
+    "What does “learning rate warmup” mean here?",
+    "report.pdf",
+    "  NOTES.md  ",
+    "transformers",
+])
+def test_is_literal_detects_exact_lookups(question):
+    assert is_literal(question)
+
+
+@pytest.mark.parametrize("question", [
+    "What are the main findings of the report?",
+    "summarize report.pdf for me",
+    'a stray " quote',
+])
+def test_is_literal_leaves_open_questions_to_the_reranker(question):
+    assert not is_literal(question)
+
+
+@pytest.mark.parametrize("message", [
+    "hi",
+    "Hello there!",
+    "thanks a lot",
+    "OK, got it.",
+    "good morning",
+    "Who are you?",
+    "what can you do",
+    "How are you ?!",
+])
+def test_needs_retrieval_skips_chitchat_and_meta_questions(message):
+    assert not needs_retrieval(message)
+
+
+@pytest.mark.parametrize("question", [
+    "What can you do about overfitting?",
+    "who are you according to chapter 2",
+    "thanks, what does section 3 say?",
+    "ok ok ok ok ok ok",
+])
+def test_needs_retrieval_keeps_document_questions(question):
+    assert needs_retrieval(question)